@@ -5,14 +5,83 @@ This script removes unnecessary files and folders to optimize the project struct
 """
 
 import os
+import errno
 import shutil
 from datetime import datetime
 from pathlib import Path
 
+_GITIGNORE_CONTENT = """# Python
+*.pyc
+*.pyo
+*.pyd
+__pycache__/
+*.so
+*.egg
+*.egg-info/
+dist/
+build/
+.pytest_cache/
+.coverage
+htmlcov/
+
+# Virtual Environment
+.venv/
+venv/
+ENV/
+env/
+
+# IDE
+.vscode/
+.idea/
+*.swp
+*.swo
+*~
+
+# macOS
+.DS_Store
+.AppleDouble
+.LSOverride
+
+# Environment Variables
+.env
+
+# Database Files
+*.db
+*.sqlite
+*.sqlite3
+*.schema.json
+.gold_cache.pkl
+
+# Results and Logs
+results/*.csv
+results/*.json
+results/*.tex
+results/paper_results_*/
+results/benchmark_*/
+*.log
+
+# Temporary Files
+*.tmp
+*.bak
+backup_*/
+
+# Jupyter Notebook
+.ipynb_checkpoints/
+*.ipynb_checkpoints
+
+# Distribution
+*.tar.gz
+*.zip
+"""
+
 class DIVASQLCleanup:
     def __init__(self, project_root=None):
         self.project_root = Path(project_root) if project_root else Path(__file__).parent
         self.backup_dir = self.project_root / f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Plain-string forms used when planning and moving files, so no Path
+        # objects are built and normalized per file
+        self._root_str = str(self.project_root)
+        self._backup_str = str(self.backup_dir)
         self.removed_count = {
             'test_files': 0,
             'databases': 0,
@@ -28,38 +97,48 @@ class DIVASQLCleanup:
         self.backup_dir.mkdir(exist_ok=True)
         print(f"📦 Creating backup directory: {self.backup_dir.name}")
     
-    def safe_remove(self, file_path, category='other'):
-        """Safely remove a file by moving it to backup"""
-        full_path = self.project_root / file_path
-        if full_path.exists() and full_path.is_file():
-            try:
-                # Create subdirectory in backup if needed
-                backup_subdir = self.backup_dir / full_path.parent.relative_to(self.project_root)
-                backup_subdir.mkdir(parents=True, exist_ok=True)
-                
-                # Move file to backup
-                shutil.move(str(full_path), str(backup_subdir / full_path.name))
-                print(f"  ❌ Removed: {file_path}")
-                self.removed_count[category] += 1
-                return True
-            except Exception as e:
-                print(f"  ⚠️  Error removing {file_path}: {e}")
-                return False
-        return False
+    def plan_remove(self, file_path, category='other'):
+        """Return the backup move for a file, or None if there is nothing to remove"""
+        src = os.path.join(self._root_str, file_path)
+        if os.path.isfile(src):
+            print(f"  ❌ Removing: {file_path}")
+            return (src, os.path.join(self._backup_str, file_path), file_path, category)
+        return None
+    
+    def plan_remove_dir(self, dir_path, category='other'):
+        """Return the backup move for a directory, or None if there is nothing to remove"""
+        src = os.path.join(self._root_str, dir_path)
+        if os.path.isdir(src):
+            print(f"  ❌ Removing directory: {dir_path}")
+            return (src, os.path.join(self._backup_str, os.path.basename(dir_path)), dir_path, category)
+        return None
+    
+    def plan_remove_files(self, file_paths, category):
+        """Return the backup moves for every existing file in file_paths"""
+        moves = (self.plan_remove(file_path, category) for file_path in file_paths)
+        return [move for move in moves if move]
     
-    def safe_remove_dir(self, dir_path, category='other'):
-        """Safely remove a directory by moving it to backup"""
-        full_path = self.project_root / dir_path
-        if full_path.exists() and full_path.is_dir():
+    def move_to_backup(self, moves):
+        """
+        Move all planned files and directories into the backup in a single pass
+        
+        Backup subdirectories are created once each, and items are moved with a
+        plain rename, falling back to shutil.move only across filesystems.
+        """
+        for backup_subdir in {os.path.dirname(dst) for _, dst, _, _ in moves}:
+            os.makedirs(backup_subdir, exist_ok=True)
+        
+        for src, dst, rel_path, category in moves:
             try:
-                shutil.move(str(full_path), str(self.backup_dir / full_path.name))
-                print(f"  ❌ Removed directory: {dir_path}")
+                try:
+                    os.rename(src, dst)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(src, dst)
                 self.removed_count[category] += 1
-                return True
             except Exception as e:
-                print(f"  ⚠️  Error removing {dir_path}: {e}")
-                return False
-        return False
+                print(f"  ⚠️  Error removing {rel_path}: {e}")
     
     def remove_test_files(self):
         """Remove redundant test files from root directory"""
@@ -75,19 +154,18 @@ class DIVASQLCleanup:
             'test_gemini_real_data.py',
             'test_specific_query.py'
         ]
-        for file in test_files:
-            self.safe_remove(file, 'test_files')
+        return self.plan_remove_files(test_files, 'test_files')
     
     def remove_databases(self):
         """Remove temporary database files"""
         print("\n2️⃣  Removing temporary database files...")
         db_files = [
             'demo_database.db',
+            'diva_cache.db',
             'salary_analysis.db',
             'test_departments.db'
         ]
-        for file in db_files:
-            self.safe_remove(file, 'databases')
+        return self.plan_remove_files(db_files, 'databases')
     
     def remove_documentation(self):
         """Remove redundant documentation files"""
@@ -100,8 +178,7 @@ class DIVASQLCleanup:
             'academic_benchmark_README.md',
             'benchmark_instructions.md'
         ]
-        for file in doc_files:
-            self.safe_remove(file, 'documentation')
+        return self.plan_remove_files(doc_files, 'documentation')
     
     def remove_scripts(self):
         """Remove redundant Python scripts"""
@@ -112,8 +189,7 @@ class DIVASQLCleanup:
             'show_results.py',
             'trace_results.py'
         ]
-        for file in script_files:
-            self.safe_remove(file, 'scripts')
+        return self.plan_remove_files(script_files, 'scripts')
     
     def remove_shell_scripts(self):
         """Remove redundant shell scripts"""
@@ -128,24 +204,35 @@ class DIVASQLCleanup:
             'setup_api_key.sh',
             'setup_gemini.sh'
         ]
-        for file in shell_files:
-            self.safe_remove(file, 'shell_scripts')
+        return self.plan_remove_files(shell_files, 'shell_scripts')
     
     def remove_package_json(self):
         """Remove unnecessary package.json"""
         print("\n6️⃣  Removing unnecessary package file...")
-        self.safe_remove('package.json', 'other')
+        return self.plan_remove_files(['package.json'], 'other')
     
     def remove_ds_store(self):
         """Remove macOS .DS_Store files"""
         print("\n7️⃣  Removing macOS system files...")
+        # Walk with plain strings and unlink relative to an open directory fd,
+        # avoiding a Path object per entry and a full path lookup per unlink
+        use_dir_fd = os.unlink in os.supports_dir_fd and hasattr(os, 'O_DIRECTORY')
         count = 0
-        for ds_store in self.project_root.rglob('.DS_Store'):
+        for dirpath, dirnames, filenames in os.walk(str(self.project_root)):
+            if '.DS_Store' not in filenames:
+                continue
             try:
-                ds_store.unlink()
+                if use_dir_fd:
+                    fd = os.open(dirpath, os.O_RDONLY | os.O_DIRECTORY)
+                    try:
+                        os.unlink('.DS_Store', dir_fd=fd)
+                    finally:
+                        os.close(fd)
+                else:
+                    os.unlink(os.path.join(dirpath, '.DS_Store'))
                 count += 1
-            except Exception as e:
-                print(f"  ⚠️  Error removing {ds_store}: {e}")
+            except OSError as e:
+                print(f"  ⚠️  Error removing {os.path.join(dirpath, '.DS_Store')}: {e}")
         print(f"  ❌ Removed {count} .DS_Store files")
     
     def clean_results(self):
@@ -159,84 +246,20 @@ class DIVASQLCleanup:
             'results/paper_table.tex',
             'results/test.txt'
         ]
-        for file in result_files:
-            self.safe_remove(file, 'results')
+        moves = self.plan_remove_files(result_files, 'results')
         
         # Remove old timestamped directories
         result_dirs = [
             'results/paper_results_20250828_185937',
             'results/paper_results_20250828_190338'
         ]
-        for dir_path in result_dirs:
-            self.safe_remove_dir(dir_path, 'results')
+        dir_moves = (self.plan_remove_dir(dir_path, 'results') for dir_path in result_dirs)
+        return moves + [move for move in dir_moves if move]
     
     def create_gitignore(self):
         """Create comprehensive .gitignore file"""
         print("\n9️⃣  Creating .gitignore file...")
-        gitignore_content = """# Python
-*.pyc
-*.pyo
-*.pyd
-__pycache__/
-*.so
-*.egg
-*.egg-info/
-dist/
-build/
-.pytest_cache/
-.coverage
-htmlcov/
-
-# Virtual Environment
-.venv/
-venv/
-ENV/
-env/
-
-# IDE
-.vscode/
-.idea/
-*.swp
-*.swo
-*~
-
-# macOS
-.DS_Store
-.AppleDouble
-.LSOverride
-
-# Environment Variables
-.env
-
-# Database Files
-*.db
-*.sqlite
-*.sqlite3
-
-# Results and Logs
-results/*.csv
-results/*.json
-results/*.tex
-results/paper_results_*/
-results/benchmark_*/
-*.log
-
-# Temporary Files
-*.tmp
-*.bak
-backup_*/
-
-# Jupyter Notebook
-.ipynb_checkpoints/
-*.ipynb_checkpoints
-
-# Distribution
-*.tar.gz
-*.zip
-"""
-        gitignore_path = self.project_root / '.gitignore'
-        with open(gitignore_path, 'w') as f:
-            f.write(gitignore_content)
+        (self.project_root / '.gitignore').write_text(_GITIGNORE_CONTENT)
         print("  ✅ Created .gitignore")
     
     def create_docs_structure(self):
@@ -273,14 +296,19 @@ backup_*/
         print("==========================\n")
         
         self.create_backup_dir()
-        self.remove_test_files()
-        self.remove_databases()
-        self.remove_documentation()
-        self.remove_scripts()
-        self.remove_shell_scripts()
-        self.remove_package_json()
+        
+        # Collect every move first, then perform them in one batched pass
+        moves = []
+        moves += self.remove_test_files()
+        moves += self.remove_databases()
+        moves += self.remove_documentation()
+        moves += self.remove_scripts()
+        moves += self.remove_shell_scripts()
+        moves += self.remove_package_json()
         self.remove_ds_store()
-        self.clean_results()
+        moves += self.clean_results()
+        self.move_to_backup(moves)
+        
         self.create_gitignore()
         self.create_docs_structure()
         self.print_summary()
@@ -43,6 +43,7 @@ safe_remove "test_specific_query.py"
 echo ""
 echo "2️⃣  Removing temporary database files..."
 safe_remove "demo_database.db"
+safe_remove "diva_cache.db"
 safe_remove "salary_analysis.db"
 safe_remove "test_departments.db"
 
@@ -7,15 +7,17 @@ with proper rate limiting to avoid exceeding API quotas.
 """
 
 import os
+import csv
 import json
 import time
+import asyncio
 import argparse
 import sqlite3
+import threading
 import pandas as pd
-from tqdm import tqdm
+from concurrent.futures import ThreadPoolExecutor
+from tqdm.asyncio import tqdm
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 # Add project root to path
 import sys
@@ -23,26 +25,53 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from src.core.pipeline import DIVASQLPipeline, PipelineStatus
 from src.utils.gemini_client import create_gemini_client
+from src.utils.rate_limiter import AsyncRateLimiter
+
+# orjson parses and serializes several times faster; fall back to the stdlib if absent
+try:
+    import orjson
+
+    def _load_json(f):
+        return orjson.loads(f.read())
+
+    def _dumps_json(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    _load_json = json.load
+    _dumps_json = json.dumps
 
 # Rate limiting parameters
 REQUESTS_PER_MINUTE = 20  # Conservative limit to avoid quota issues
 REQUEST_INTERVAL = 60 / REQUESTS_PER_MINUTE  # Seconds between requests
+MAX_CONCURRENT_REQUESTS = REQUESTS_PER_MINUTE  # Requests allowed in flight at once
+
+# Columns of the results CSV, in output order
+RESULT_FIELDS = ['id', 'question', 'gold_sql', 'generated_sql', 'status', 'time', 'errors', 'decomposition']
 
 class RateLimitedBenchmark:
     def __init__(self, benchmark='synthetic', split='dev', model='gemini-2.0-flash', 
-                 limit=None, output='results/academic_benchmark/results.csv'):
+                 limit=None, output='results/academic_benchmark/results.parquet',
+                 concurrency=MAX_CONCURRENT_REQUESTS):
         self.benchmark = benchmark
         self.split = split
         self.model = model
         self.limit = limit
         self.output_path = output
+        self.concurrency = concurrency
+        
+        # Parquet is the analysis artifact; the CSV next to it is the crash-safe
+        # journal rows are streamed into, and doubles as a human-readable export
+        output_base = os.path.splitext(self.output_path)[0]
+        self.parquet_path = output_base + '.parquet'
+        self.csv_path = output_base + '.csv'
         
         # Create output directory
         os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
         
-        # Initialize LLM client
+        # Initialize LLM client; pipelines keep per-query state, so each
+        # worker thread lazily creates its own (see _get_pipeline)
         self.client = create_gemini_client(model_name=self.model)
-        self.pipeline = DIVASQLPipeline(self.client, model_name=self.model)
+        self._local = threading.local()
         
         # Load data
         self.data = self.load_data()
@@ -62,75 +91,130 @@ class RateLimitedBenchmark:
             raise FileNotFoundError(f"Dataset not found: {data_path}. "
                                     f"Please run download_datasets.py first.")
         
-        with open(data_path, 'r') as f:
-            data = json.load(f)
+        with open(data_path, 'rb') as f:
+            data = _load_json(f)
             
         # Limit the number of examples if specified
         if self.limit:
             data = data[:self.limit]
+        
+        # JSON loading gives every example its own copy of its database's
+        # schema; intern them by db_id so the per-schema prompt caches hit
+        schemas = {}
+        for example in data:
+            if 'db_id' in example and 'schema' in example:
+                example['schema'] = schemas.setdefault(example['db_id'], example['schema'])
             
         print(f"Loaded {len(data)} examples from {data_path}")
         return data
         
+    def _get_pipeline(self):
+        """Return the pipeline owned by the calling worker thread"""
+        pipeline = getattr(self._local, 'pipeline', None)
+        if pipeline is None:
+            pipeline = DIVASQLPipeline(self.client, model_name=self.model)
+            self._local.pipeline = pipeline
+        return pipeline
+        
+    def _evaluate_example(self, i, example):
+        """Run DIVA-SQL on a single example (executed on a worker thread)"""
+        # Extract query and schema
+        query_text = example['question']
+        schema = example['schema']
+        gold_sql = example.get('query', '')  # Gold SQL query if available
+        
+        # Run DIVA-SQL on the query
+        start_time = time.time()
+        try:
+            result = self._get_pipeline().run(query_text, schema)
+            elapsed_time = time.time() - start_time
+            
+            # Process the result
+            return {
+                'id': example.get('id', i),
+                'question': query_text,
+                'gold_sql': gold_sql,
+                'generated_sql': result.sql if result.status == PipelineStatus.SUCCESS else '',
+                'status': result.status.name,
+                'time': elapsed_time,
+                'errors': str(result.errors) if result.errors else '',
+                'decomposition': _dumps_json(result.decomposition) if result.decomposition else ''
+            }
+            
+        except Exception as e:
+            elapsed_time = time.time() - start_time
+            # Record the error
+            return {
+                'id': example.get('id', i),
+                'question': query_text,
+                'gold_sql': gold_sql,
+                'generated_sql': '',
+                'status': 'ERROR',
+                'time': elapsed_time,
+                'errors': str(e),
+                'decomposition': ''
+            }
+    
+    async def _run_all(self, examples, on_result):
+        """Dispatch all examples concurrently, bounded by the concurrency cap and rate limit"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limiter = AsyncRateLimiter(REQUESTS_PER_MINUTE, 60)
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            async def run_one(i, example):
+                async with semaphore:
+                    await limiter.acquire()
+                    return await loop.run_in_executor(executor, self._evaluate_example, i, example)
+            
+            tasks = [run_one(i, example) for i, example in examples]
+            for task in tqdm.as_completed(tasks, total=len(tasks)):
+                on_result(await task)
+    
+    def _load_completed_ids(self):
+        """Return the ids already recorded in the results journal by a previous run"""
+        if not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0:
+            return set()
+        return set(pd.read_csv(self.csv_path, usecols=['id'], dtype=str)['id'])
+        
     def run_evaluation(self):
-        """Run the benchmark evaluation with rate limiting"""
-        results = []
-        
-        print(f"Running evaluation on {len(self.data)} examples...")
-        for i, example in enumerate(tqdm(self.data)):
-            # Extract query and schema
-            query_text = example['question']
-            schema = example['schema']
-            gold_sql = example.get('query', '')  # Gold SQL query if available
+        """
+        Run the benchmark evaluation with rate limiting
+        
+        Rows are appended to the CSV journal as soon as each example finishes, so an
+        interrupted run (crash, exhausted quota) can be restarted and will skip the
+        examples that were already recorded. Once the run completes, the journal is
+        converted to the zstd-compressed Parquet file used for analysis.
+        """
+        completed_ids = self._load_completed_ids()
+        pending = [(i, example) for i, example in enumerate(self.data)
+                   if str(example.get('id', i)) not in completed_ids]
+        if completed_ids:
+            print(f"Resuming: {len(self.data) - len(pending)} examples already in {self.csv_path}")
+        
+        print(f"Running evaluation on {len(pending)} examples "
+              f"(up to {self.concurrency} in flight)...")
+        with open(self.csv_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            if f.tell() == 0:
+                writer.writeheader()
+            
+            def write_result(result_data):
+                writer.writerow(result_data)
+                f.flush()
             
-            # Apply rate limiting
-            if i > 0:
-                time.sleep(REQUEST_INTERVAL)
-                
-            # Run DIVA-SQL on the query
-            start_time = time.time()
-            try:
-                result = self.pipeline.run(query_text, schema)
-                elapsed_time = time.time() - start_time
-                
-                # Process the result
-                result_data = {
-                    'id': example.get('id', i),
-                    'question': query_text,
-                    'gold_sql': gold_sql,
-                    'generated_sql': result.sql if result.status == PipelineStatus.SUCCESS else '',
-                    'status': result.status.name,
-                    'time': elapsed_time,
-                    'errors': str(result.errors) if result.errors else '',
-                    'decomposition': json.dumps(result.decomposition) if result.decomposition else ''
-                }
-                results.append(result_data)
-                
-            except Exception as e:
-                elapsed_time = time.time() - start_time
-                # Record the error
-                results.append({
-                    'id': example.get('id', i),
-                    'question': query_text,
-                    'gold_sql': gold_sql,
-                    'generated_sql': '',
-                    'status': 'ERROR',
-                    'time': elapsed_time,
-                    'errors': str(e),
-                    'decomposition': ''
-                })
-                
-        # Save results
-        df = pd.DataFrame(results)
-        df.to_csv(self.output_path, index=False)
-        print(f"Results saved to {self.output_path}")
+            asyncio.run(self._run_all(pending, write_result))
+        
+        df = pd.read_csv(self.csv_path)
+        df.to_parquet(self.parquet_path, compression='zstd', index=False)
+        print(f"Results saved to {self.parquet_path} (CSV export: {self.csv_path})")
         
         return df
         
     def analyze_results(self, results_df=None):
         """Analyze the benchmark results"""
         if results_df is None:
-            results_df = pd.read_csv(self.output_path)
+            results_df = pd.read_parquet(self.parquet_path)
             
         # Calculate success rate
         total = len(results_df)
@@ -145,7 +229,12 @@ class RateLimitedBenchmark:
         for error_type, count in error_counts.items():
             print(f"  {error_type}: {count} ({count/total*100:.2f}%)")
             
-        # Visualize results
+        # Visualize results; matplotlib is imported here so evaluation-only runs
+        # don't pay its import cost, and the Agg backend skips display setup
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        
         plt.figure(figsize=(10, 6))
         
         # Success rate pie chart
@@ -164,7 +253,7 @@ class RateLimitedBenchmark:
         plt.tight_layout()
         
         # Save the visualization
-        viz_path = self.output_path.replace('.csv', '_viz.png')
+        viz_path = os.path.splitext(self.parquet_path)[0] + '_viz.png'
         plt.savefig(viz_path)
         print(f"Visualization saved to {viz_path}")
         
@@ -180,8 +269,10 @@ def main():
                         help='LLM model to use')
     parser.add_argument('--limit', type=int, default=None,
                         help='Limit evaluation to N examples')
-    parser.add_argument('--output', type=str, default='results/academic_benchmark/results.csv',
-                        help='Output file for results')
+    parser.add_argument('--output', type=str, default='results/academic_benchmark/results.parquet',
+                        help='Output file for results (a CSV export is written alongside)')
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help='Maximum number of examples evaluated concurrently')
     parser.add_argument('--analyze-only', action='store_true',
                         help='Only analyze existing results without running evaluation')
     args = parser.parse_args()
@@ -191,7 +282,8 @@ def main():
         split=args.split,
         model=args.model,
         limit=args.limit,
-        output=args.output
+        output=args.output,
+        concurrency=args.concurrency
     )
     
     if not args.analyze_only:
@@ -5,12 +5,22 @@ This script evaluates DIVA-SQL on established benchmarks like Spider and BIRD.
 """
 
 import os
+import csv
 import json
 import time
+import atexit
+import asyncio
 import argparse
+import functools
+import multiprocessing
+import pickle
+import struct
+import hashlib
 import sqlite3
+import threading
 import pandas as pd
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from tqdm.asyncio import tqdm
 from pathlib import Path
 
 # Add project root to path
@@ -19,6 +29,24 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from src.core.pipeline import DIVASQLPipeline, PipelineStatus
 from src.utils.gemini_client import create_gemini_client
+from src.utils.rate_limiter import AsyncRateLimiter
+
+# orjson parses and serializes several times faster; fall back to the stdlib if absent
+try:
+    import orjson
+
+    def _load_json(f):
+        return orjson.loads(f.read())
+
+    def _dumps_json(obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    _load_json = json.load
+    _dumps_json = json.dumps
+
+# Columns of the results CSV, in output order
+RESULT_FIELDS = ['id', 'question', 'generated_sql', 'gold_sql', 'status', 'confidence', 'execution_time',
+                 'syntactically_valid', 'execution_match', 'node_count', 'error_message']
 
 # Configuration
 def parse_args():
@@ -33,138 +61,473 @@ def parse_args():
                         help='Limit evaluation to N examples (for testing)')
     parser.add_argument('--output', type=str, default='results/benchmark_results.csv',
                         help='Output file for results')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Maximum number of examples evaluated concurrently')
+    parser.add_argument('--requests-per-minute', type=int, default=20,
+                        help='Maximum number of examples started per minute (0 disables the limit)')
+    parser.add_argument('--validation-workers', type=int, default=None,
+                        help='Processes used to execute and compare SQL (default: one per CPU)')
     return parser.parse_args()
 
 def load_spider_data(split='dev'):
     """Load the Spider benchmark data"""
     data_path = f'data/benchmarks/spider/{split}.json'
-    with open(data_path, 'r') as f:
-        data = json.load(f)
+    with open(data_path, 'rb') as f:
+        data = _load_json(f)
+    
+    # Extract each distinct database's schema once, in parallel
+    db_paths = {db_id: f'data/benchmarks/spider/database/{db_id}/{db_id}.sqlite'
+                for db_id in {item['db_id'] for item in data}}
+    schemas = extract_schemas(db_paths.values())
     
     # Process data into a list of examples
-    examples = []
-    for item in data:
-        db_id = item['db_id']
-        db_path = f'data/benchmarks/spider/database/{db_id}/{db_id}.sqlite'
-        
-        # Extract schema
-        schema = extract_schema_from_sqlite(db_path)
-        
-        examples.append({
-            'id': f"spider_{db_id}_{len(examples)}",
+    return [
+        {
+            'id': f"spider_{item['db_id']}_{i}",
             'question': item['question'],
-            'db_id': db_id,
-            'db_path': db_path,
-            'schema': schema,
+            'db_id': item['db_id'],
+            'db_path': db_paths[item['db_id']],
+            'schema': schemas[db_paths[item['db_id']]],
             'gold_sql': item['query']
-        })
-    
-    return examples
+        }
+        for i, item in enumerate(data)
+    ]
 
 def load_bird_data(split='dev'):
     """Load the BIRD benchmark data"""
     data_path = f'data/benchmarks/bird-{split}.json'
-    with open(data_path, 'r') as f:
-        data = json.load(f)
+    with open(data_path, 'rb') as f:
+        data = _load_json(f)
+    
+    # Extract each distinct database's schema once, in parallel
+    db_paths = {db_id: f'data/benchmarks/bird/databases/{db_id}.sqlite'
+                for db_id in {item['db_id'] for item in data}}
+    schemas = extract_schemas(db_paths.values())
     
     # Process data into a list of examples
-    examples = []
-    for item in data:
-        db_id = item['db_id']
-        db_path = f'data/benchmarks/bird/databases/{db_id}.sqlite'
-        
-        # Extract schema
-        schema = extract_schema_from_sqlite(db_path)
-        
-        examples.append({
+    return [
+        {
             'id': item['question_id'],
             'question': item['question'],
-            'db_id': db_id,
-            'db_path': db_path,
-            'schema': schema,
+            'db_id': item['db_id'],
+            'db_path': db_paths[item['db_id']],
+            'schema': schemas[db_paths[item['db_id']]],
             'gold_sql': item['SQL']
-        })
-    
-    return examples
+        }
+        for item in data
+    ]
 
+@functools.lru_cache(maxsize=None)
 def extract_schema_from_sqlite(db_path):
-    """Extract database schema from SQLite file"""
+    """
+    Extract database schema from SQLite file
+    
+    Benchmarks reuse a handful of databases across many questions, so schemas are
+    memoized per path and persisted to a `<db_path>.schema.json` sidecar that is
+    reused for as long as it is newer than the database file.
+    """
+    cache_path = db_path + '.schema.json'
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(db_path):
+            with open(cache_path, 'rb') as f:
+                return _load_json(f)
+    except (OSError, ValueError):
+        pass
+    
     try:
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = [table[0] for table in cursor.fetchall() 
-                 if not table[0].startswith('sqlite_')]
+        # Get the columns of every table in a single query
+        cursor.execute(
+            "SELECT m.name, p.name FROM sqlite_master AS m "
+            "JOIN pragma_table_info(m.name) AS p "
+            "WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' "
+            "ORDER BY m.rowid, p.cid;"
+        )
         
         schema = {"tables": {}}
-        
-        # Get columns for each table
-        for table in tables:
-            cursor.execute(f"PRAGMA table_info({table});")
-            columns = [col[1] for col in cursor.fetchall()]
-            schema["tables"][table] = columns
+        for table, column in cursor.fetchall():
+            schema["tables"].setdefault(table, []).append(column)
         
         conn.close()
-        return schema
     except Exception as e:
         print(f"Error extracting schema from {db_path}: {e}")
         return {"tables": {}}
+    
+    try:
+        with open(cache_path, 'w') as f:
+            f.write(_dumps_json(schema))
+    except OSError:
+        pass
+    
+    return schema
+
+def extract_schemas(db_paths, max_workers=16):
+    """
+    Extract the schemas of several SQLite files concurrently
+    
+    Each extraction is blocking file I/O, so a thread pool keeps many reads
+    in flight at once. Returns a dict mapping each path to its schema.
+    """
+    db_paths = list(db_paths)
+    if not db_paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(db_paths))) as executor:
+        return dict(zip(db_paths, executor.map(extract_schema_from_sqlite, db_paths)))
+
+# Read-only SQLite connections, one per (worker thread, database)
+_connections = threading.local()
+_all_connections = []
+_all_connections_lock = threading.Lock()
+
+def get_connection(db_path):
+    """Return the calling thread's connection to db_path, opening it on first use"""
+    cache = getattr(_connections, 'by_path', None)
+    if cache is None:
+        cache = _connections.by_path = {}
+    
+    conn = cache.get(db_path)
+    if conn is None:
+        # check_same_thread is only relaxed so the atexit hook can close it
+        conn = sqlite3.connect(Path(db_path).resolve().as_uri() + '?mode=ro', uri=True,
+                               check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute("PRAGMA mmap_size = 268435456")
+        cache[db_path] = conn
+        with _all_connections_lock:
+            _all_connections.append(conn)
+    return conn
 
-def execute_sql(sql, db_path):
-    """Execute SQL query and return results"""
+@atexit.register
+def _close_connections():
+    with _all_connections_lock:
+        for conn in _all_connections:
+            conn.close()
+        _all_connections.clear()
+
+_DIGEST_MASK = (1 << 64) - 1
+
+def _value_hash(value):
+    """
+    Hash a result value, stably across processes
+    
+    Values are tagged by kind, so NULL, 0, '0' and b'0' all differ, while an
+    integral float hashes like the equal int (1 == 1.0, as with tuple equality).
+    The built-in hash() is not used for numbers: small ints hash to themselves,
+    which the row digest cannot mix well, and hash(-1) == hash(-2).
+    """
+    if value is None:
+        data = b'n'
+    elif isinstance(value, str):
+        data = b's' + value.encode('utf-8', 'surrogatepass')
+    elif isinstance(value, bytes):
+        data = b'b' + value
+    elif isinstance(value, float) and not value.is_integer():
+        data = b'f' + struct.pack('<d', value)
+    elif isinstance(value, (int, float)):
+        value = int(value)
+        data = b'i' + value.to_bytes(value.bit_length() // 8 + 1, 'little', signed=True)
+    else:
+        data = b'r' + repr(value).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+def _result_summary(cursor, expected=None, batch_size=1024):
+    """
+    Summarize a query's rows as (column count, row count, order-insensitive digest)
+    
+    Column order matters within a row (FNV-style combine); row order does not
+    (rows are summed), so two result multisets compare equal iff their summaries do,
+    barring hash collisions. Rows are consumed in batches, in constant memory.
+    
+    If `expected` is the summary being compared against, a different column count
+    returns before any row is fetched, and hashing stops once more rows than
+    expected have been read; the digest is None in both cases since no match is possible.
+    """
+    column_count = len(cursor.description or ())
+    if expected is not None and column_count != expected[0]:
+        return column_count, None, None
+    max_rows = expected[1] if expected is not None else None
+    
+    row_count = 0
+    digest = 0
+    for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+        row_count += len(rows)
+        if max_rows is not None and row_count > max_rows:
+            return column_count, row_count, None
+        for row in rows:
+            row_hash = 14695981039346656037
+            for value in row:
+                row_hash = ((row_hash * 1099511628211) ^ _value_hash(value)) & _DIGEST_MASK
+            digest = (digest + row_hash) & _DIGEST_MASK
+    return column_count, row_count, digest
+
+def execute_sql(sql, db_path, expected=None):
+    """
+    Execute SQL query and return (success, result summary) or (False, error message)
+    
+    `expected` is an optional summary to compare against; see _result_summary.
+    """
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        cursor = get_connection(db_path).cursor()
         cursor.execute(sql)
-        results = cursor.fetchall()
-        conn.close()
-        return True, results
+        summary = _result_summary(cursor, expected)
+        cursor.close()
+        return True, summary
     except Exception as e:
         return False, str(e)
 
-def evaluate_example(example, pipeline):
-    """Evaluate DIVA-SQL on a single example"""
+# Gold query summaries persisted across runs, keyed by (db_path, sha1(gold_sql),
+# summary version); each entry records the database mtime it was computed against.
+# Bump _SUMMARY_VERSION whenever _result_summary or _value_hash changes
+_SUMMARY_VERSION = 2
+_GOLD_CACHE_PATH = Path('.gold_cache.pkl')
+_GOLD_CACHE_FLUSH_EVERY = 100
+_gold_cache = None
+_gold_cache_pending = 0
+_gold_cache_lock = threading.Lock()
+
+def _load_gold_cache():
+    try:
+        return pickle.loads(_GOLD_CACHE_PATH.read_bytes())
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+
+def _write_gold_cache():
+    # Write to a temporary file first so an interrupted run never leaves a truncated cache
+    tmp_path = _GOLD_CACHE_PATH.with_name(_GOLD_CACHE_PATH.name + '.tmp')
+    try:
+        tmp_path.write_bytes(pickle.dumps(_gold_cache, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp_path, _GOLD_CACHE_PATH)
+    except OSError as e:
+        print(f"Warning: could not write gold result cache: {e}")
+
+@atexit.register
+def flush_gold_cache():
+    """Persist any gold results computed since the cache was last written"""
+    global _gold_cache_pending
+    with _gold_cache_lock:
+        if _gold_cache_pending:
+            _write_gold_cache()
+            _gold_cache_pending = 0
+
+def _gold_cache_key(gold_sql, db_path):
+    return (db_path, hashlib.sha1(gold_sql.encode('utf-8')).digest(), _SUMMARY_VERSION)
+
+def lookup_gold_execution(gold_sql, db_path):
+    """Return the cached execute_sql result of a gold query, or None if it must be run"""
+    global _gold_cache
+    try:
+        mtime = os.path.getmtime(db_path)
+    except OSError:
+        return None
+    
+    with _gold_cache_lock:
+        if _gold_cache is None:
+            _gold_cache = _load_gold_cache()
+        cached = _gold_cache.get(_gold_cache_key(gold_sql, db_path))
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    return None
+
+def store_gold_execution(gold_sql, db_path, execution):
+    """Record the execute_sql result of a gold query for later runs"""
+    global _gold_cache, _gold_cache_pending
+    try:
+        mtime = os.path.getmtime(db_path)
+    except OSError:
+        return
+    
+    with _gold_cache_lock:
+        if _gold_cache is None:
+            _gold_cache = _load_gold_cache()
+        _gold_cache[_gold_cache_key(gold_sql, db_path)] = (mtime, execution)
+        _gold_cache_pending += 1
+        if _gold_cache_pending >= _GOLD_CACHE_FLUSH_EVERY:
+            _write_gold_cache()
+            _gold_cache_pending = 0
+
+def execute_gold_sql(gold_sql, db_path):
+    """
+    Execute a gold query like execute_sql, reusing the result of a previous run
+    
+    Gold results only change when the database does, so they are cached on disk
+    and recomputed only for new queries or databases modified since.
+    """
+    execution = lookup_gold_execution(gold_sql, db_path)
+    if execution is None:
+        execution = execute_sql(gold_sql, db_path)
+        store_gold_execution(gold_sql, db_path, execution)
+    return execution
+
+# Example fields needed to validate generated SQL; the schema is left behind so
+# examples sent to validation worker processes stay small
+VALIDATION_FIELDS = ('id', 'question', 'gold_sql', 'db_path')
+
+def llm_step(example, pipeline):
+    """Generate SQL for an example, keeping only the fields the result row needs"""
     start_time = time.time()
     result = pipeline.generate_sql(example['question'], example['schema'])
     end_time = time.time()
     
-    # Try to execute both generated and gold SQL
-    generated_execution = execute_sql(result.final_sql, example['db_path']) if result.final_sql else (False, "No SQL generated")
-    gold_execution = execute_sql(example['gold_sql'], example['db_path'])
+    return {
+        'final_sql': result.final_sql,
+        'status': result.status.value if hasattr(result, 'status') else 'UNKNOWN',
+        'confidence': result.confidence_score if hasattr(result, 'confidence_score') else 0.0,
+        'execution_time': end_time - start_time,
+        'node_count': len(result.semantic_dag.nodes) if result.semantic_dag else 0
+    }
+
+def validate_step(example, generation, gold_execution=None):
+    """
+    Execute the generated and gold SQL of an example and build its result row
+    
+    `gold_execution` is the gold query's execute_sql result if already known.
+    """
+    if gold_execution is None:
+        gold_execution = execute_gold_sql(example['gold_sql'], example['db_path'])
+    
+    # The gold result is known first so the generated result can bail out as soon
+    # as its shape disagrees with it
+    final_sql = generation['final_sql']
+    expected = gold_execution[1] if gold_execution[0] else None
+    generated_execution = execute_sql(final_sql, example['db_path'], expected) if final_sql else (False, "No SQL generated")
     
-    # Check if results match
+    # Check if results match (summaries ignore row order)
     execution_match = False
     if generated_execution[0] and gold_execution[0]:
-        # Compare result sets (ignoring order)
-        generated_results = set(map(tuple, generated_execution[1]))
-        gold_results = set(map(tuple, gold_execution[1]))
-        execution_match = generated_results == gold_results
+        execution_match = generated_execution[1] == gold_execution[1]
     
     return {
         'id': example['id'],
         'question': example['question'],
-        'generated_sql': result.final_sql,
+        'generated_sql': final_sql,
         'gold_sql': example['gold_sql'],
-        'status': result.status.value if hasattr(result, 'status') else 'UNKNOWN',
-        'confidence': result.confidence_score if hasattr(result, 'confidence_score') else 0.0,
-        'execution_time': end_time - start_time,
+        'status': generation['status'],
+        'confidence': generation['confidence'],
+        'execution_time': generation['execution_time'],
         'syntactically_valid': generated_execution[0],
         'execution_match': execution_match,
-        'node_count': len(result.semantic_dag.nodes) if result.semantic_dag else 0,
+        'node_count': generation['node_count'],
         'error_message': generated_execution[1] if not generated_execution[0] else None
     }
 
+def evaluate_example(example, pipeline):
+    """Evaluate DIVA-SQL on a single example"""
+    return validate_step(example, llm_step(example, pipeline))
+
+def error_result(example, error):
+    """Build the result row recorded for an example whose evaluation raised"""
+    return {
+        'id': example['id'],
+        'question': example['question'],
+        'generated_sql': None,
+        'gold_sql': example['gold_sql'],
+        'status': 'ERROR',
+        'confidence': 0.0,
+        'execution_time': 0.0,
+        'syntactically_valid': False,
+        'execution_match': False,
+        'node_count': 0,
+        'error_message': str(error)
+    }
+
+# Validation workers start while generation threads and their gRPC channels are
+# live, and forking in that state can deadlock; start them from a clean process
+_VALIDATION_MP_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+def _init_validation_worker():
+    # A worker must never use connection objects created in another process;
+    # start from an empty connection cache whatever the start method
+    global _connections, _all_connections
+    _connections = threading.local()
+    _all_connections = []
+
+def _validate_in_worker(example, generation, gold_execution):
+    """Validation worker entry point; returns the row and the gold execution result"""
+    # Gold results are stored by the parent, which owns the on-disk cache
+    if gold_execution is None:
+        gold_execution = execute_sql(example['gold_sql'], example['db_path'])
+    return validate_step(example, generation, gold_execution), gold_execution
+
+def evaluate_examples(examples, pipeline_factory, concurrency=8, requests_per_minute=None,
+                      on_result=None, validation_workers=None):
+    """
+    Evaluate examples concurrently
+    
+    SQL generation is network-bound, so it runs on a bounded pool of worker threads
+    and overlapping the calls cuts wall time roughly by the concurrency factor.
+    DIVASQLPipeline keeps per-query state on the instance, so each worker thread
+    builds its own pipeline with `pipeline_factory`. Executing and comparing the
+    generated and gold SQL is CPU-bound, so it runs on a pool of
+    `validation_workers` processes (default: one per CPU).
+    
+    If `on_result` is given, each result is passed to it as soon as it completes and
+    nothing is retained; otherwise the results are returned in completion order.
+    """
+    results = []
+    asyncio.run(_evaluate_examples_async(examples, pipeline_factory, concurrency,
+                                         requests_per_minute, on_result or results.append,
+                                         validation_workers or os.cpu_count() or 1))
+    return results
+
+async def _evaluate_examples_async(examples, pipeline_factory, concurrency, requests_per_minute,
+                                   on_result, validation_workers):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = AsyncRateLimiter(requests_per_minute, 60) if requests_per_minute else None
+    local = threading.local()
+    
+    def generate(example):
+        pipeline = getattr(local, 'pipeline', None)
+        if pipeline is None:
+            pipeline = local.pipeline = pipeline_factory()
+        return llm_step(example, pipeline)
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor, \
+            ProcessPoolExecutor(max_workers=validation_workers,
+                                mp_context=_VALIDATION_MP_CONTEXT,
+                                initializer=_init_validation_worker) as validators:
+        async def submit(example):
+            try:
+                # Only generation holds a concurrency slot; validation does not call the API
+                async with semaphore:
+                    if limiter:
+                        await limiter.acquire()
+                    generation = await loop.run_in_executor(executor, generate, example)
+                
+                gold_execution = lookup_gold_execution(example['gold_sql'], example['db_path'])
+                row, executed = await loop.run_in_executor(
+                    validators, _validate_in_worker,
+                    {field: example[field] for field in VALIDATION_FIELDS}, generation, gold_execution
+                )
+                if gold_execution is None:
+                    store_gold_execution(example['gold_sql'], example['db_path'], executed)
+                return row
+            except Exception as e:
+                print(f"Error evaluating example {example['id']}: {e}")
+                return error_result(example, e)
+        
+        tasks = [submit(example) for example in examples]
+        for task in tqdm.as_completed(tasks, total=len(tasks), desc="Evaluating examples"):
+            on_result(await task)
+
+def load_completed_ids(output_path):
+    """Return the ids already recorded in a results CSV by a previous run"""
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return set()
+    return set(pd.read_csv(output_path, usecols=['id'], dtype=str)['id'])
+
 def main():
     args = parse_args()
     
     # Set up results directory
     os.makedirs(os.path.dirname(args.output), exist_ok=True)
     
-    # Initialize the client and pipeline
+    # Initialize the client; each worker thread creates its own pipeline
     client = create_gemini_client(model_name=args.model)
-    pipeline = DIVASQLPipeline(client, model_name=args.model)
     
     # Load the appropriate benchmark data
     if args.benchmark == 'spider':
@@ -179,36 +542,45 @@ def main():
         examples = examples[:args.limit]
         print(f"Limited to first {args.limit} examples")
     
-    # Evaluate each example
-    results = []
-    for example in tqdm(examples, desc="Evaluating examples"):
-        try:
-            result = evaluate_example(example, pipeline)
-            results.append(result)
-        except Exception as e:
-            print(f"Error evaluating example {example['id']}: {e}")
-            results.append({
-                'id': example['id'],
-                'question': example['question'],
-                'generated_sql': None,
-                'gold_sql': example['gold_sql'],
-                'status': 'ERROR',
-                'confidence': 0.0,
-                'execution_time': 0.0,
-                'syntactically_valid': False,
-                'execution_match': False,
-                'node_count': 0,
-                'error_message': str(e)
-            })
-    
-    # Calculate overall metrics
-    total = len(results)
-    valid_syntax = sum(1 for r in results if r['syntactically_valid'])
-    execution_match = sum(1 for r in results if r['execution_match'])
-    success_rate = sum(1 for r in results if r['status'] == 'SUCCESS') / total if total > 0 else 0
-    avg_confidence = sum(r['confidence'] for r in results) / total if total > 0 else 0
-    avg_time = sum(r['execution_time'] for r in results) / total if total > 0 else 0
-    avg_nodes = sum(r['node_count'] for r in results if r['node_count'] > 0) / sum(1 for r in results if r['node_count'] > 0) if sum(1 for r in results if r['node_count'] > 0) > 0 else 0
+    # Skip examples already recorded by an interrupted earlier run
+    completed_ids = load_completed_ids(args.output)
+    if completed_ids:
+        examples = [example for example in examples if str(example['id']) not in completed_ids]
+        print(f"Resuming: {len(completed_ids)} examples already in {args.output}")
+    
+    # Evaluate examples concurrently, appending each row to the CSV as it completes
+    with open(args.output, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if f.tell() == 0:
+            writer.writeheader()
+        
+        def write_result(result):
+            writer.writerow(result)
+            f.flush()
+        
+        evaluate_examples(
+            examples,
+            lambda: DIVASQLPipeline(client, model_name=args.model),
+            concurrency=args.concurrency,
+            requests_per_minute=args.requests_per_minute,
+            on_result=write_result,
+            validation_workers=args.validation_workers
+        )
+    flush_gold_cache()
+    print(f"Results saved to {args.output}")
+    
+    # Metrics cover every recorded row, including those from resumed runs
+    df = pd.read_csv(args.output)
+    
+    # Calculate overall metrics as vectorized column reductions
+    total = len(df)
+    valid_syntax = int(df['syntactically_valid'].sum())
+    execution_match = int(df['execution_match'].sum())
+    success_rate = float((df['status'] == 'SUCCESS').mean()) if total > 0 else 0
+    avg_confidence = float(df['confidence'].mean()) if total > 0 else 0
+    avg_time = float(df['execution_time'].mean()) if total > 0 else 0
+    node_counts = df.loc[df['node_count'] > 0, 'node_count']
+    avg_nodes = float(node_counts.mean()) if len(node_counts) > 0 else 0
     
     print(f"\nEvaluation Results on {args.benchmark} {args.split} (n={total}):")
     print(f"Syntactically Valid: {valid_syntax}/{total} ({valid_syntax/total:.2%})" if total > 0 else "No results")
@@ -218,11 +590,6 @@ def main():
     print(f"Average Execution Time: {avg_time:.2f}s")
     print(f"Average Semantic Nodes: {avg_nodes:.1f}")
     
-    # Save results to CSV
-    df = pd.DataFrame(results)
-    df.to_csv(args.output, index=False)
-    print(f"Results saved to {args.output}")
-    
     # Save summary metrics
     summary = {
         'benchmark': args.benchmark,
@@ -25,6 +25,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 try:
     from src.core.pipeline import DIVASQLPipeline
     from src.utils.gemini_client import GeminiLLMClient
+    from src.utils.rate_limiter import RateLimiter
 except ImportError as e:
     print(f"Error importing DIVA-SQL modules: {e}")
     print("Make sure DIVA-SQL is properly installed and in your Python path.")
@@ -257,7 +258,12 @@ def main():
     results = []
     print("\nRunning benchmark evaluation...")
     
+    # Pace request starts; time spent inside the API call counts toward DELAY
+    limiter = RateLimiter(1, DELAY)
     for i, example in enumerate(examples):
+        waited = limiter.acquire()
+        if waited > 0:
+            print(f"\nWaited {waited:.1f} seconds to avoid API rate limits")
         print(f"\n[{i+1}/{len(examples)}] Processing: {example['question']}")
         
         try:
@@ -268,11 +274,6 @@ def main():
             print(f"  Execution Match: {result['execution_match']}")
             print(f"  Confidence: {result['confidence_score']:.2f}")
             print(f"  Time: {result['elapsed_time']:.2f}s")
-            
-            # Add delay to avoid rate limiting
-            if i < len(examples) - 1:
-                print(f"\nWaiting {DELAY} seconds to avoid API rate limits...")
-                time.sleep(DELAY)
         except Exception as e:
             print(f"❌ Error processing example: {e}")
             import traceback
@@ -5,6 +5,7 @@ This script evaluates DIVA-SQL on established benchmarks with rate limiting for
 """
 
 import os
+import csv
 import json
 import time
 import argparse
@@ -16,9 +17,32 @@ from pathlib import Path
 import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
-from evaluation.benchmark_eval import load_spider_data, load_bird_data, evaluate_example, execute_sql
+from evaluation.benchmark_eval import (
+    load_spider_data, load_bird_data, evaluate_example, error_result, RESULT_FIELDS
+)
 from src.utils.gemini_client import create_gemini_client
 from src.core.pipeline import DIVASQLPipeline
+from src.utils.rate_limiter import RateLimiter
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# orjson parses several times faster; fall back to the stdlib if absent
+try:
+    import orjson
+
+    def _load_json(f):
+        return orjson.loads(f.read())
+except ImportError:
+    _load_json = json.load
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Rate-limited evaluation of DIVA-SQL')
@@ -29,13 +53,40 @@ def parse_args():
     parser.add_argument('--sample', type=int, default=10,
                         help='Number of examples to randomly sample')
     parser.add_argument('--delay', type=float, default=3.0,
-                        help='Delay between API calls in seconds')
-    parser.add_argument('--output', type=str, default='results/sampled_results.csv',
-                        help='Output file for results')
+                        help='Minimum interval between the start of API calls in seconds')
+    parser.add_argument('--requests-per-minute', type=float, default=None,
+                        help='Pace API calls to this rate instead of using --delay')
+    parser.add_argument('--output', type=str, default='results/sampled_results.parquet',
+                        help='Output file for results (.parquet or .csv)')
     parser.add_argument('--model', type=str, default='gemini-2.0-flash',
                         help='LLM model to use')
     return parser.parse_args()
 
+def sample_json_array(path, k):
+    """
+    Randomly sample up to k (index, item) pairs from a file holding a JSON array
+    
+    With ijson installed the file is streamed through a reservoir sample, so at
+    most k items are held in memory; otherwise the whole array is loaded.
+    The pairs are returned in file order.
+    """
+    if ijson is None:
+        with open(path, 'rb') as f:
+            items = list(enumerate(_load_json(f)))
+        return sorted(random.sample(items, k)) if k < len(items) else items
+    
+    reservoir = []
+    with open(path, 'rb') as f:
+        for i, item in enumerate(ijson.items(f, 'item', use_float=True)):
+            if i < k:
+                reservoir.append((i, item))
+            else:
+                j = random.randint(0, i)
+                if j < k:
+                    reservoir[j] = (i, item)
+    reservoir.sort(key=lambda pair: pair[0])
+    return reservoir
+
 def main():
     args = parse_args()
 
@@ -58,24 +109,23 @@ def main():
                 print("Please run evaluation/create_synthetic_dataset.py first")
                 return
             
-            # Load examples
-            with open(synthetic_dir / "dev.json", 'r') as f:
-                data = json.load(f)
+            # Load only the sampled examples
+            sampled = sample_json_array(synthetic_dir / "dev.json", args.sample)
             
             # Load table schema
-            with open(synthetic_dir / "tables.json", 'r') as f:
-                tables_data = json.load(f)
-                
-            examples = []
-            for i, item in enumerate(data):
-                # Extract schema information
-                schema = {
-                    "tables": {
-                        table_name: tables_data[table_name]["column_names"] 
-                        for table_name in tables_data
-                    }
+            with open(synthetic_dir / "tables.json", 'rb') as f:
+                tables_data = _load_json(f)
+            
+            # Every synthetic example uses the same schema
+            schema = {
+                "tables": {
+                    table_name: tables_data[table_name]["column_names"] 
+                    for table_name in tables_data
                 }
+            }
                 
+            examples = []
+            for i, item in sampled:
                 examples.append({
                     "id": f"synthetic-{i+1}",
                     "db_id": item["db_id"],
@@ -85,7 +135,7 @@ def main():
                     "schema": schema
                 })
             
-            print(f"Loaded {len(examples)} examples from synthetic dataset")
+            print(f"Sampled {len(examples)} examples from synthetic dataset")
         elif args.benchmark == 'spider':
             examples = load_spider_data(args.split)
         else:  # bird
@@ -105,36 +155,24 @@ def main():
     
     print(f"Randomly sampled {len(sampled_examples)} examples for evaluation")
     
-    # Evaluate each example with delay
+    # Evaluate each example, pacing request starts; time spent inside the
+    # API call counts toward the delay, so slow calls are not padded further
+    if args.requests_per_minute:
+        limiter = RateLimiter(args.requests_per_minute, 60)
+    else:
+        limiter = RateLimiter(1, args.delay) if args.delay > 0 else None
     results = []
-    for i, example in enumerate(tqdm(sampled_examples, desc="Evaluating examples")):
+    progress = tqdm(sampled_examples, desc="Evaluating examples")
+    for example in progress:
+        if limiter is not None:
+            limiter.acquire()
         try:
-            print(f"\n[{i+1}/{len(sampled_examples)}] Processing: {example['question']}")
             result = evaluate_example(example, pipeline)
-            results.append(result)
-            print(f"  Status: {result['status']}, Execution Match: {result['execution_match']}")
-            # Add delay to avoid rate limiting
-            if i < len(sampled_examples) - 1:  # No need to delay after the last example
-                print(f"  Waiting {args.delay} seconds to avoid rate limiting...")
-                time.sleep(args.delay)
         except Exception as e:
-            print(f"Error evaluating example {example['id']}: {e}")
-            results.append({
-                'id': example['id'],
-                'question': example['question'],
-                'generated_sql': None,
-                'gold_sql': example['gold_sql'],
-                'status': 'ERROR',
-                'confidence': 0.0,
-                'execution_time': 0.0,
-                'syntactically_valid': False,
-                'execution_match': False,
-                'node_count': 0,
-                'error_message': str(e)
-            })
-            # Still add delay even on error
-            if i < len(sampled_examples) - 1:
-                time.sleep(args.delay)
+            progress.write(f"Error evaluating example {example['id']}: {e}")
+            result = error_result(example, e)
+        results.append(result)
+        progress.set_postfix(status=result['status'], match=result['execution_match'])
     
     # Calculate overall metrics
     total = len(results)
@@ -150,35 +188,41 @@ def main():
     else:
         print("\nNo results collected.")
     
-    # Save results to CSV
-    try:
-        import pandas as pd
-        df = pd.DataFrame(results)
-        df.to_csv(args.output, index=False)
-        print(f"Results saved to {args.output}")
-
-        # Save summary metrics
-        if total > 0:
-            summary = {
-                'benchmark': args.benchmark,
-                'split': args.split,
-                'model': args.model,
-                'total_examples': total,
-                'syntactically_valid': valid_syntax,
-                'execution_match': execution_match,
-                'success_rate': success_rate,
-                'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            summary_path = os.path.join(os.path.dirname(args.output), f'{args.benchmark}_summary.json')
-            with open(summary_path, 'w') as f:
-                json.dump(summary, f, indent=2)
-            
-            print(f"Summary saved to {summary_path}")
-    except ImportError:
-        print("Pandas not installed. Saving results as JSON instead.")
-        with open(args.output.replace('.csv', '.json'), 'w') as f:
-            json.dump(results, f, indent=2)
+    # Save results as Parquet (columnar, compressed) or, for a .csv path or
+    # without pyarrow, as CSV
+    output_path = args.output
+    if output_path.endswith('.parquet') and pq is None:
+        output_path = os.path.splitext(output_path)[0] + '.csv'
+        print("pyarrow is not installed; writing CSV instead")
+    
+    if output_path.endswith('.parquet'):
+        table = pa.Table.from_pydict({field: [r[field] for r in results] for field in RESULT_FIELDS})
+        pq.write_table(table, output_path, compression='snappy')
+    else:
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    print(f"Results saved to {output_path}")
+    
+    # Save summary metrics
+    if total > 0:
+        summary = {
+            'benchmark': args.benchmark,
+            'split': args.split,
+            'model': args.model,
+            'total_examples': total,
+            'syntactically_valid': valid_syntax,
+            'execution_match': execution_match,
+            'success_rate': success_rate,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        
+        summary_path = os.path.join(os.path.dirname(args.output), f'{args.benchmark}_summary.json')
+        with open(summary_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        
+        print(f"Summary saved to {summary_path}")
 
 if __name__ == '__main__':
     main()
@@ -9,8 +9,13 @@ import argparse
 import json
 import time
 import sqlite3
+import numpy as np
+from collections import Counter
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any
+from types import SimpleNamespace
+from typing import Dict, List, Any, Optional
 import sys
 
 # Add src to path
@@ -18,7 +23,72 @@ sys.path.append(str(Path(__file__).parents[1] / "src"))
 
 from evaluation.framework import (
     BenchmarkEvaluator, DIVASQLSystem, ZeroShotBaselineSystem,
-    BenchmarkResults, EvaluationResult
+    BenchmarkResults, EvaluationResult, GenerationCache
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# orjson serializes several times faster; fall back to the stdlib if absent
+try:
+    import orjson
+
+    def _dumps_json(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS |
+                            orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    def _dumps_json(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+
+# Layout of the research report; optional sections are spliced in with their
+# leading newline so they leave no blank line when empty
+_REPORT_TEMPLATE = """DIVA-SQL Research Evaluation Report
+{rule}
+Generated: {{generated}}
+
+## Research Question 1: Accuracy Comparison
+{section_rule}
+{table_header}
+{table_rule}
+{{system_rows}}
+
+### Statistical Analysis:
+- McNemar's test p-value: [To be calculated]
+- Effect size: [To be calculated]
+
+## Research Question 2: Human Study Configuration
+{section_rule}
+Total study queries: {{study_queries}}
+Study design: {{study_type}}
+Conditions: {{conditions}}
+
+## Research Question 3: Error Prevention Analysis
+{section_rule}
+Total semantic nodes processed: {{total_nodes}}
+Verification success rate: {{verification_success_rate:.3f}}
+Error types detected: {{error_type_count}}
+
+### Error Types Caught:{{error_type_rows}}
+
+## Key Findings
+{section_rule}{{comparison}}
+2. Verification system caught {{error_type_count}} different error types
+3. Human study configured with {{study_queries}} challenging queries
+
+## Limitations and Future Work
+{section_rule}
+1. Evaluation limited to [benchmark size] queries
+2. Human study results pending data collection
+3. Comparison with additional baselines recommended
+4. Cross-domain evaluation needed""".format(
+    rule="=" * 50,
+    section_rule="-" * 40,
+    table_rule="-" * 50,
+    table_header=f"{'System':<20} {'EX':<8} {'VES':<8} {'Time(s)':<10}"
 )
 
 
@@ -31,12 +101,20 @@ class ResearchEvaluator:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.timestamp = int(time.time())
+        # Formatted once so the report and its file name refer to the same run time
+        self.timestamp_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.timestamp))
     
     def run_rq1_evaluation(self, llm_client, benchmark_data: List[Dict], 
-                          database_schema: Dict, database_path: str) -> Dict[str, BenchmarkResults]:
+                          database_schema: Dict, database_path: str,
+                          max_concurrency: int = 8,
+                          cache_path: Optional[str] = None) -> Dict[str, BenchmarkResults]:
         """
         Research Question 1: Accuracy Evaluation
         Does DIVA-SQL achieve higher execution accuracy on complex queries?
+        
+        Up to `max_concurrency` LLM requests per system are kept in flight at once.
+        If `cache_path` is given, generated SQL is stored there and questions seen
+        in earlier runs are answered from it without calling the LLM.
         """
         print("=== RQ1: Accuracy Evaluation ===")
         
@@ -49,19 +127,34 @@ class ResearchEvaluator:
             # "MAC-SQL": MACSQLSystem(llm_client),
         }
         
-        # Run evaluation
-        evaluator = BenchmarkEvaluator(database_path)
+        # Run evaluation; systems are independent and mostly wait on the LLM,
+        # so they are evaluated concurrently against a shared evaluator
+        generation_cache = GenerationCache(cache_path) if cache_path else None
+        evaluator = BenchmarkEvaluator(database_path, max_concurrency=max_concurrency,
+                                       generation_cache=generation_cache)
         results = {}
         
-        for system_name, system in systems.items():
-            print(f"\nEvaluating {system_name}...")
-            system_results = evaluator.evaluate_system(system, benchmark_data, database_schema)
-            results[system_name] = system_results
+        print(f"\nEvaluating {', '.join(systems)}...")
+        with ThreadPoolExecutor(max_workers=len(systems)) as pool:
+            futures = {
+                system_name: pool.submit(evaluator.evaluate_system, system,
+                                         benchmark_data, database_schema)
+                for system_name, system in systems.items()
+            }
             
-            # Print interim results
-            print(f"  EX: {system_results.execution_accuracy:.3f}")
-            print(f"  VES: {system_results.avg_valid_efficiency_score:.3f}")
-            print(f"  Avg Time: {system_results.avg_execution_time:.2f}s")
+            for system_name, future in futures.items():
+                system_results = future.result()
+                results[system_name] = system_results
+                
+                # Print interim results
+                print(f"\n{system_name}:")
+                print(f"  EX: {system_results.execution_accuracy:.3f}")
+                print(f"  VES: {system_results.avg_valid_efficiency_score:.3f}")
+                print(f"  Avg Time: {system_results.avg_execution_time:.2f}s")
+        
+        evaluator.close()
+        if generation_cache is not None:
+            generation_cache.close()
         
         # Save detailed results
         self._save_rq1_results(results)
@@ -109,8 +202,7 @@ class ResearchEvaluator:
         
         # Save study configuration
         study_file = self.output_dir / f"human_study_config_{self.timestamp}.json"
-        with open(study_file, 'w') as f:
-            json.dump(study_config, f, indent=2)
+        self._write_bytes(study_file, _dumps_json(study_config))
         
         print(f"Human study configuration saved to: {study_file}")
         
@@ -123,37 +215,31 @@ class ResearchEvaluator:
         """
         print("=== RQ3: Error Prevention Analysis ===")
         
+        # Flatten the verification logs of all DIVA results into one list of node
+        # entries, then count statuses and issue types in a single pass each
+        log_entries = [
+            log_entry
+            for result in diva_results.results_by_query
+            if result.metadata
+            for log_entry in result.metadata.get("verification_log") or ()
+        ]
+        status_counts = Counter(log_entry.get("verification_status") for log_entry in log_entries)
+        error_type_counts = Counter(
+            issue.get("type", "unknown")
+            for log_entry in log_entries
+            for issue in log_entry.get("issues") or ()
+        )
+        
         verification_stats = {
-            "total_nodes": 0,
-            "nodes_verified": 0,
-            "nodes_failed": 0,
+            "total_nodes": len(log_entries),
+            "nodes_verified": status_counts["PASS"],
+            "nodes_failed": status_counts["FAIL"],
             "correction_attempts": 0,
             "successful_corrections": 0,
-            "error_types_caught": {},
+            "error_types_caught": dict(error_type_counts),
             "verification_time": 0.0
         }
         
-        # Analyze verification logs from DIVA results
-        for result in diva_results.results_by_query:
-            if result.metadata and "verification_log" in result.metadata:
-                verification_log = result.metadata["verification_log"]
-                
-                for log_entry in verification_log:
-                    verification_stats["total_nodes"] += 1
-                    
-                    status = log_entry.get("verification_status")
-                    if status == "PASS":
-                        verification_stats["nodes_verified"] += 1
-                    elif status == "FAIL":
-                        verification_stats["nodes_failed"] += 1
-                    
-                    # Count error types
-                    issues = log_entry.get("issues", [])
-                    for issue in issues:
-                        error_type = issue.get("type", "unknown")
-                        verification_stats["error_types_caught"][error_type] = \
-                            verification_stats["error_types_caught"].get(error_type, 0) + 1
-        
         # Calculate metrics
         if verification_stats["total_nodes"] > 0:
             verification_stats["verification_success_rate"] = \
@@ -164,8 +250,7 @@ class ResearchEvaluator:
         
         # Save analysis
         analysis_file = self.output_dir / f"rq3_error_prevention_analysis_{self.timestamp}.json"
-        with open(analysis_file, 'w') as f:
-            json.dump(verification_stats, f, indent=2)
+        self._write_bytes(analysis_file, _dumps_json(verification_stats))
         
         print(f"Error prevention analysis saved to: {analysis_file}")
         print(f"Verification success rate: {verification_stats.get('verification_success_rate', 0):.3f}")
@@ -181,90 +266,73 @@ class ResearchEvaluator:
         """
         print("=== Generating Research Report ===")
         
-        report_lines = []
-        report_lines.append("DIVA-SQL Research Evaluation Report")
-        report_lines.append("=" * 50)
-        report_lines.append(f"Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        
         # RQ1 Results
-        report_lines.append("\n## Research Question 1: Accuracy Comparison")
-        report_lines.append("-" * 40)
-        
-        report_lines.append(f"{'System':<20} {'EX':<8} {'VES':<8} {'Time(s)':<10}")
-        report_lines.append("-" * 50)
-        
-        for system_name, results in rq1_results.items():
-            report_lines.append(
-                f"{system_name:<20} "
-                f"{results.execution_accuracy:<8.3f} "
-                f"{results.avg_valid_efficiency_score:<8.3f} "
-                f"{results.avg_execution_time:<10.2f}"
-            )
-        
-        # Statistical significance (placeholder)
-        report_lines.append("\n### Statistical Analysis:")
-        report_lines.append("- McNemar's test p-value: [To be calculated]")
-        report_lines.append("- Effect size: [To be calculated]")
-        
-        # RQ2 Setup
-        report_lines.append("\n## Research Question 2: Human Study Configuration")
-        report_lines.append("-" * 40)
-        report_lines.append(f"Total study queries: {len(rq2_config['queries'])}")
-        report_lines.append(f"Study design: {rq2_config['study_type']}")
-        report_lines.append(f"Conditions: {', '.join(rq2_config['conditions'])}")
+        system_rows = "\n".join(
+            f"{system_name:<20} "
+            f"{results.execution_accuracy:<8.3f} "
+            f"{results.avg_valid_efficiency_score:<8.3f} "
+            f"{results.avg_execution_time:<10.2f}"
+            for system_name, results in rq1_results.items()
+        )
         
         # RQ3 Analysis
-        report_lines.append("\n## Research Question 3: Error Prevention Analysis")
-        report_lines.append("-" * 40)
-        report_lines.append(f"Total semantic nodes processed: {rq3_analysis['total_nodes']}")
-        report_lines.append(f"Verification success rate: {rq3_analysis.get('verification_success_rate', 0):.3f}")
-        report_lines.append(f"Error types detected: {len(rq3_analysis['error_types_caught'])}")
-        
-        report_lines.append("\n### Error Types Caught:")
-        for error_type, count in rq3_analysis['error_types_caught'].items():
-            report_lines.append(f"  - {error_type}: {count}")
-        
-        # Conclusions
-        report_lines.append("\n## Key Findings")
-        report_lines.append("-" * 40)
+        error_type_rows = "".join(
+            f"\n  - {error_type}: {count}"
+            for error_type, count in rq3_analysis['error_types_caught'].items()
+        )
         
         # Compare DIVA-SQL vs best baseline
+        comparison = ""
         if "DIVA-SQL" in rq1_results:
             diva_ex = rq1_results["DIVA-SQL"].execution_accuracy
             baseline_systems = {k: v for k, v in rq1_results.items() if k != "DIVA-SQL"}
             
             if baseline_systems:
-                best_baseline = max(baseline_systems.values(), key=lambda x: x.execution_accuracy)
-                best_baseline_name = next(k for k, v in baseline_systems.items() if v == best_baseline)
+                best_baseline_name, best_baseline = max(
+                    baseline_systems.items(), key=lambda item: item[1].execution_accuracy
+                )
                 
                 improvement = diva_ex - best_baseline.execution_accuracy
-                report_lines.append(f"1. DIVA-SQL achieved {diva_ex:.3f} EX vs {best_baseline.execution_accuracy:.3f} for {best_baseline_name}")
-                report_lines.append(f"   Improvement: {improvement:+.3f} ({improvement/best_baseline.execution_accuracy*100:+.1f}%)")
-        
-        report_lines.append(f"2. Verification system caught {len(rq3_analysis['error_types_caught'])} different error types")
-        report_lines.append(f"3. Human study configured with {len(rq2_config['queries'])} challenging queries")
-        
-        # Future work
-        report_lines.append("\n## Limitations and Future Work")
-        report_lines.append("-" * 40)
-        report_lines.append("1. Evaluation limited to [benchmark size] queries")
-        report_lines.append("2. Human study results pending data collection")
-        report_lines.append("3. Comparison with additional baselines recommended")
-        report_lines.append("4. Cross-domain evaluation needed")
-        
-        report_content = "\n".join(report_lines)
+                comparison = (
+                    f"\n1. DIVA-SQL achieved {diva_ex:.3f} EX vs {best_baseline.execution_accuracy:.3f} for {best_baseline_name}"
+                    f"\n   Improvement: {improvement:+.3f} ({improvement/best_baseline.execution_accuracy*100:+.1f}%)"
+                )
+        
+        report_content = _REPORT_TEMPLATE.format(
+            generated=self.timestamp_str,
+            system_rows=system_rows,
+            study_queries=len(rq2_config['queries']),
+            study_type=rq2_config['study_type'],
+            conditions=', '.join(rq2_config['conditions']),
+            total_nodes=rq3_analysis['total_nodes'],
+            verification_success_rate=rq3_analysis.get('verification_success_rate', 0),
+            error_type_count=len(rq3_analysis['error_types_caught']),
+            error_type_rows=error_type_rows,
+            comparison=comparison
+        )
         
         # Save report
         report_file = self.output_dir / f"research_report_{self.timestamp}.md"
-        with open(report_file, 'w') as f:
-            f.write(report_content)
+        self._write_bytes(report_file, report_content.encode())
         
         print(f"Research report saved to: {report_file}")
         
         return report_content
     
+    @staticmethod
+    def _write_bytes(path: Path, data: bytes):
+        """Write a fully serialized artifact with a single buffered write"""
+        with open(path, 'wb', buffering=1 << 20) as f:
+            f.write(data)
+    
     def _save_rq1_results(self, results: Dict[str, BenchmarkResults]):
-        """Save RQ1 detailed results"""
+        """
+        Save RQ1 detailed results
+        
+        Per-system metrics go to a JSON summary. With pyarrow installed, the
+        per-query rows of all systems go to one columnar Parquet file next to it,
+        referenced from the summary; otherwise they are embedded in the JSON.
+        """
         rq1_data = {}
         
         for system_name, benchmark_results in results.items():
@@ -273,8 +341,37 @@ class ResearchEvaluator:
                 "avg_valid_efficiency_score": benchmark_results.avg_valid_efficiency_score,
                 "avg_execution_time": benchmark_results.avg_execution_time,
                 "total_queries": benchmark_results.total_queries,
-                "error_analysis": benchmark_results.error_analysis,
-                "detailed_results": [
+                "error_analysis": benchmark_results.error_analysis
+            }
+        
+        if pq is not None:
+            detailed_file = self.output_dir / f"rq1_detailed_results_{self.timestamp}.parquet"
+            rows = [
+                (system_name, r)
+                for system_name, benchmark_results in results.items()
+                for r in benchmark_results.results_by_query
+            ]
+            table = pa.table({
+                "system_name": pa.array([system_name for system_name, _ in rows], type=pa.string()),
+                "query_id": pa.array([str(r.query_id) for _, r in rows], type=pa.string()),
+                "execution_accuracy": pa.array([bool(r.execution_accuracy) for _, r in rows],
+                                               type=pa.bool_()),
+                # VES lies in [0, 1] and is reported to three decimals, which
+                # half precision still resolves
+                "valid_efficiency_score": pa.array(np.array(
+                    [r.valid_efficiency_score for _, r in rows], dtype=np.float16
+                )),
+                "execution_time": pa.array([r.execution_time for _, r in rows], type=pa.float32()),
+                "error_message": pa.array([r.error_message for _, r in rows], type=pa.string())
+            })
+            # Both repeat heavily across rows, so dictionary encoding shrinks them most
+            pq.write_table(table, detailed_file, compression="zstd",
+                           use_dictionary=["system_name", "error_message"])
+            for system_data in rq1_data.values():
+                system_data["detailed_results_file"] = detailed_file.name
+        else:
+            for system_name, benchmark_results in results.items():
+                rq1_data[system_name]["detailed_results"] = [
                     {
                         "query_id": r.query_id,
                         "execution_accuracy": r.execution_accuracy,
@@ -284,11 +381,9 @@ class ResearchEvaluator:
                     }
                     for r in benchmark_results.results_by_query
                 ]
-            }
         
         rq1_file = self.output_dir / f"rq1_accuracy_results_{self.timestamp}.json"
-        with open(rq1_file, 'w') as f:
-            json.dump(rq1_data, f, indent=2)
+        self._write_bytes(rq1_file, _dumps_json(rq1_data))
         
         print(f"RQ1 detailed results saved to: {rq1_file}")
 
@@ -318,8 +413,13 @@ def create_sample_benchmark():
 
 
 def setup_sample_database(db_path: str):
-    """Set up a sample database for testing"""
-    conn = sqlite3.connect(db_path)
+    """
+    Set up a sample database for testing
+    
+    The database is built in memory and copied to `db_path` in one backup, which
+    replaces any previous contents of that file.
+    """
+    conn = sqlite3.connect(":memory:")
     cursor = conn.cursor()
     
     # Create tables
@@ -343,9 +443,11 @@ def setup_sample_database(db_path: str):
     """)
     
     # Insert sample data
-    cursor.execute("INSERT OR REPLACE INTO Departments VALUES (1, 'Engineering', 101)")
-    cursor.execute("INSERT OR REPLACE INTO Departments VALUES (2, 'Sales', 102)")
-    cursor.execute("INSERT OR REPLACE INTO Departments VALUES (3, 'Marketing', 103)")
+    departments = [
+        (1, 'Engineering', 101),
+        (2, 'Sales', 102),
+        (3, 'Marketing', 103)
+    ]
     
     # Insert sample employees
     employees = [
@@ -356,10 +458,16 @@ def setup_sample_database(db_path: str):
         (5, 'Charlie Davis', 3, '2023-01-30', 60000)
     ]
     
-    for emp in employees:
-        cursor.execute("INSERT OR REPLACE INTO Employees VALUES (?, ?, ?, ?, ?)", emp)
+    # One transaction for all rows, committed when the block exits
+    with conn:
+        cursor.executemany("INSERT OR REPLACE INTO Departments VALUES (?, ?, ?)", departments)
+        cursor.executemany("INSERT OR REPLACE INTO Employees VALUES (?, ?, ?, ?, ?)", employees)
     
-    conn.commit()
+    disk_conn = sqlite3.connect(db_path)
+    try:
+        conn.backup(disk_conn)
+    finally:
+        disk_conn.close()
     conn.close()
     
     print(f"Sample database created at: {db_path}")
@@ -372,6 +480,10 @@ def main():
                        default="sample", help="Benchmark to use")
     parser.add_argument("--output-dir", default="results", help="Output directory")
     parser.add_argument("--database-path", default="temp/sample.db", help="Database path")
+    parser.add_argument("--max-concurrency", type=int, default=8,
+                       help="Maximum LLM requests in flight per system")
+    parser.add_argument("--cache-path", default=None,
+                       help="SQLite file caching generated SQL across runs (disabled if omitted)")
     
     args = parser.parse_args()
     
@@ -381,15 +493,17 @@ def main():
     
     # Mock LLM client for demonstration
     class MockLLMClient:
+        # The answer is fixed, so one response object is built up front and
+        # returned from every call instead of a new class tree per call
+        RESPONSE = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content="SELECT T2.DeptName FROM Employees AS T1 JOIN Departments AS T2 ON T1.DeptID = T2.DeptID WHERE T1.HireDate > '2022-01-01' GROUP BY T2.DeptID HAVING COUNT(*) > 10"
+        ))])
+        
         class Chat:
             class Completions:
                 def create(self, **kwargs):
-                    class Response:
-                        class Choice:
-                            class Message:
-                                content = "SELECT T2.DeptName FROM Employees AS T1 JOIN Departments AS T2 ON T1.DeptID = T2.DeptID WHERE T1.HireDate > '2022-01-01' GROUP BY T2.DeptID HAVING COUNT(*) > 10"
-                        choices = [Choice()]
-                    return Response()
+                    return MockLLMClient.RESPONSE
+            completions = Completions()
         chat = Chat()
     
     llm_client = MockLLMClient()
@@ -416,20 +530,22 @@ def main():
     print(f"Running research evaluation with {len(benchmark_data)} queries")
     
     # Run RQ1: Accuracy Evaluation
-    rq1_results = evaluator.run_rq1_evaluation(llm_client, benchmark_data, schema, args.database_path)
+    rq1_results = evaluator.run_rq1_evaluation(llm_client, benchmark_data, schema, args.database_path,
+                                               max_concurrency=args.max_concurrency,
+                                               cache_path=args.cache_path)
     
     # Run RQ2: Human Study Setup (using failed queries from RQ1)
-    failed_queries = []
-    for system_name, results in rq1_results.items():
-        for result in results.results_by_query:
-            if not result.execution_accuracy:
-                failed_queries.append({
-                    "query_id": result.query_id,
-                    "question": result.natural_language,
-                    "sql": result.gold_sql,
-                    "predicted_sql": result.predicted_sql,
-                    "error_message": result.error_message
-                })
+    failed_queries = [
+        {
+            "query_id": result.query_id,
+            "question": result.natural_language,
+            "sql": result.gold_sql,
+            "predicted_sql": result.predicted_sql,
+            "error_message": result.error_message
+        }
+        for result in chain.from_iterable(results.results_by_query for results in rq1_results.values())
+        if not result.execution_accuracy
+    ]
     
     rq2_config = evaluator.run_rq2_setup(failed_queries)
     
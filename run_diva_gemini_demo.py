@@ -12,47 +12,116 @@ Usage:
 
 import os
 import sys
+import atexit
 import argparse
 import sqlite3
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import random
 import json
-import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
 
 # Add src to path  
 sys.path.append(str(Path(__file__).parent / "src"))
 
-try:
-    import google.generativeai as genai
-    from src.utils.gemini_client import create_gemini_client
-    from src.core.pipeline import DIVASQLPipeline
-    from src.core.semantic_dag import SemanticDAG, SemanticNode
-except ImportError as e:
-    print(f"❌ Import Error: {e}")
-    print("Make sure you've installed all dependencies:")
-    print("pip3 install google-generativeai")
-    sys.exit(1)
+# The Gemini SDK and the DIVA-SQL pipeline are imported in setup_pipeline, so
+# --schema-only does not pay for loading them
+
+
+# Discount rates applied to roughly 30% of the generated sale items
+DISCOUNTS = (0, 0.05, 0.1, 0.15)
+
+# Stored in the _meta table of a persisted demo database; bump it whenever the
+# schema or the generated data changes so older files are rebuilt
+DEMO_DB_VERSION = 1
+
+# SQLite builds before 3.32 reject statements with more than 999 parameters
+SQLITE_MAX_PARAMETERS = 999
+
+
+@lru_cache(maxsize=None)
+def insert_statement(table: str, width: int, row_count: int = 1) -> str:
+    """
+    Return the INSERT statement for row_count rows of width values each
+    
+    The sqlite3 module reuses a prepared statement only for the identical SQL
+    string, so every insert of a given shape is issued with the same text.
+    """
+    row_placeholder = "(" + ", ".join("?" * width) + ")"
+    return f"INSERT INTO {table} VALUES " + ", ".join([row_placeholder] * row_count)
+
+
+def bulk_insert(cursor, table: str, rows: list):
+    """
+    Insert rows with multi-row INSERT ... VALUES statements
+    
+    Each statement carries as many rows as the parameter limit allows, so SQLite
+    runs one prepared program per chunk instead of one per row.
+    """
+    if not rows:
+        return
+    
+    width = len(rows[0])
+    chunk_size = max(1, SQLITE_MAX_PARAMETERS // width)
+    
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        cursor.execute(insert_statement(table, width, len(chunk)),
+                       [value for row in chunk for value in row])
+
+
+def emit(*lines):
+    """Write lines to stdout in a single call, e.g. one report block per query"""
+    sys.stdout.write("\n".join(map(str, lines)) + "\n")
+    sys.stdout.flush()
 
 
 class ComprehensiveDemo:
     """Complete DIVA-SQL demonstration with Gemini"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache_path: str = None, persist_path: str = None,
+                 with_pipeline: bool = True, reset_db: bool = False):
         self.api_key = api_key
-        self.db_path = "demo_database.db"
+        # The demo database lives in memory. With a persist_path it is loaded
+        # from that file when it holds the current version, and otherwise built
+        # and saved there; reset_db forces a rebuild
+        self.db_path = ":memory:"
+        self.persist_path = persist_path
+        self.reset_db = reset_db
         self.setup_database()
-        self.setup_pipeline()
+        if with_pipeline:
+            self.setup_pipeline()
+            self.setup_response_cache(cache_path)
     
     def setup_database(self):
         """Create a comprehensive demo database"""
         print("🏗️  Setting up demo database...")
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # One connection serves setup and every demo query; it is closed on exit.
+        # Demo queries run on a dedicated executor thread, one at a time
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        atexit.register(self.conn.close)
+        
+        if self.persist_path and not self.reset_db and self.load_persisted_database():
+            cursor = self.conn.cursor()
+            self.schema = self._build_schema(cursor)
+            cursor.close()
+            self.conn.execute("PRAGMA query_only = ON")
+            print(f"✅ Demo database loaded: {self.persist_path}")
+            return
+        
+        cursor = self.conn.cursor()
+        
+        # Drop, create and populate in one transaction, i.e. a single commit
+        cursor.execute("BEGIN")
         
         # Drop existing tables
-        tables = ['sales', 'products', 'customers', 'orders', 'employees', 'departments']
+        tables = ['sales', 'products', 'customers', 'orders', 'employees', 'departments', '_meta']
         for table in tables:
             cursor.execute(f"DROP TABLE IF EXISTS {table}")
         
@@ -73,7 +142,7 @@ class ComprehensiveDemo:
             CREATE TABLE employees (
                 emp_id INTEGER PRIMARY KEY,
                 name TEXT NOT NULL,
-                email TEXT UNIQUE,
+                email TEXT,
                 dept_id INTEGER,
                 salary REAL,
                 hire_date DATE,
@@ -87,7 +156,7 @@ class ComprehensiveDemo:
             CREATE TABLE customers (
                 customer_id INTEGER PRIMARY KEY,
                 name TEXT NOT NULL,
-                email TEXT UNIQUE,
+                email TEXT,
                 city TEXT,
                 state TEXT,
                 registration_date DATE,
@@ -135,12 +204,60 @@ class ComprehensiveDemo:
             )
         """)
         
-        # Insert sample data
+        # Insert sample data, then index it; building each index once over the
+        # loaded table is cheaper than maintaining it row by row during the load
         self.populate_sample_data(cursor)
-        conn.commit()
-        conn.close()
+        self.create_indexes(cursor)
+        
+        # Marks a complete build, so a persisted copy can be reused next time
+        cursor.execute("CREATE TABLE _meta (version INTEGER NOT NULL)")
+        cursor.execute("INSERT INTO _meta VALUES (?)", (DEMO_DB_VERSION,))
+        
+        # The schema is fixed from here on, so read it once while the cursor is open
+        self.schema = self._build_schema(cursor)
+        self.conn.commit()
+        cursor.close()
+        
+        if self.persist_path:
+            # The backup replaces the whole file; removing it first also covers
+            # a file that is not a readable database at all
+            if os.path.exists(self.persist_path):
+                os.remove(self.persist_path)
+            disk_conn = sqlite3.connect(self.persist_path)
+            try:
+                self.conn.backup(disk_conn)
+            finally:
+                disk_conn.close()
+            print(f"✅ Demo database created: {self.persist_path}")
+        else:
+            print("✅ Demo database created in memory")
+        
+        # From here on the connection only runs generated queries
+        self.conn.execute("PRAGMA query_only = ON")
+    
+    def load_persisted_database(self) -> bool:
+        """
+        Copy the persisted demo database into memory if it is a current build
+        
+        Returns:
+            False if the file is missing, unreadable or from another version
+        """
+        if not os.path.exists(self.persist_path):
+            return False
         
-        print(f"✅ Demo database created: {self.db_path}")
+        disk_conn = sqlite3.connect(self.persist_path)
+        try:
+            try:
+                row = disk_conn.execute("SELECT version FROM _meta").fetchone()
+            except sqlite3.DatabaseError:
+                return False
+            if row is None or row[0] != DEMO_DB_VERSION:
+                return False
+            
+            disk_conn.backup(self.conn)
+        finally:
+            disk_conn.close()
+        return True
     
     def populate_sample_data(self, cursor):
         """Insert realistic sample data"""
@@ -153,7 +270,7 @@ class ComprehensiveDemo:
             (4, 'Customer Service', 200000, 'Austin'),
             (5, 'Operations', 400000, 'Chicago')
         ]
-        cursor.executemany("INSERT INTO departments VALUES (?, ?, ?, ?)", departments)
+        cursor.executemany(insert_statement("departments", 4), departments)
         
         # Employees
         employees = [
@@ -166,24 +283,30 @@ class ComprehensiveDemo:
             (7, 'David Lee', 'david.lee@company.com', 5, 72000, '2021-12-03', 'Operations Manager'),
             (8, 'Anna Martinez', 'anna.m@company.com', 2, 82000, '2022-07-18', 'DevOps Engineer')
         ]
-        cursor.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?, ?)", employees)
+        cursor.executemany(insert_statement("employees", 7), employees)
         
         # Customers
-        customers = []
+        num_customers = 50
         cities = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego']
         states = ['NY', 'CA', 'IL', 'TX', 'AZ', 'PA', 'TX', 'CA']
         customer_types = ['Premium', 'Standard', 'Basic']
         
-        for i in range(1, 51):  # 50 customers
-            name = f"Customer {i:02d}"
-            email = f"customer{i:02d}@email.com"
-            city = random.choice(cities)
-            state = random.choice(states)
-            reg_date = datetime.now() - timedelta(days=random.randint(30, 730))
-            ctype = random.choice(customer_types)
-            customers.append((i, name, email, city, state, reg_date.strftime('%Y-%m-%d'), ctype))
+        # Draw every random attribute for all customers at once; dates are
+        # formatted with isoformat(), which yields YYYY-MM-DD without strftime
+        today = date.today()
+        customers = [
+            (i, f"Customer {i:02d}", f"customer{i:02d}@email.com", city, state,
+             (today - timedelta(days=reg_days)).isoformat(), ctype)
+            for i, city, state, reg_days, ctype in zip(
+                range(1, num_customers + 1),
+                random.choices(cities, k=num_customers),
+                random.choices(states, k=num_customers),
+                random.choices(range(30, 731), k=num_customers),
+                random.choices(customer_types, k=num_customers)
+            )
+        ]
         
-        cursor.executemany("INSERT INTO customers VALUES (?, ?, ?, ?, ?, ?, ?)", customers)
+        cursor.executemany(insert_statement("customers", 7), customers)
         
         # Products
         products = [
@@ -198,64 +321,84 @@ class ComprehensiveDemo:
             (9, 'Keyboard RGB', 'Electronics', 129.99, 75, 35, 'KeyCorp'),
             (10, 'Standing Desk', 'Furniture', 599.99, 350, 8, 'ErgoCorp')
         ]
-        cursor.executemany("INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?)", products)
+        cursor.executemany(insert_statement("products", 7), products)
         
-        # Orders and Sales
+        # Orders and Sales; rows are collected here and inserted in one batch per table
         order_id = 1
         sale_id = 1
-        
-        for customer_id in range(1, 51):
-            # Each customer has 1-4 orders
-            num_orders = random.randint(1, 4)
+        order_rows = []
+        sale_rows = []
+        
+        # Each customer has 1-4 orders; once the order count is known, the status
+        # and shipping city of every order are drawn up front in one call each
+        orders_per_customer = random.choices(range(1, 5), k=num_customers)
+        price_by_product = {product[0]: product[3] for product in products}
+        order_customers = [customer_id
+                           for customer_id, num_orders in enumerate(orders_per_customer, 1)
+                           for _ in range(num_orders)]
+        statuses = random.choices(['Completed', 'Pending', 'Shipped', 'Cancelled'],
+                                  k=len(order_customers))
+        shipping_cities = random.choices(cities, k=len(order_customers))
+        
+        for customer_id, status, shipping_city in zip(order_customers, statuses, shipping_cities):
+            order_date = (today - timedelta(days=random.randint(1, 365))).isoformat()
             
-            for _ in range(num_orders):
-                order_date = datetime.now() - timedelta(days=random.randint(1, 365))
-                status = random.choice(['Completed', 'Pending', 'Shipped', 'Cancelled'])
-                shipping_city = random.choice(cities)
-                
-                # Create order 
-                order_total = 0
-                order_items = []
-                
-                # 1-5 items per order
-                num_items = random.randint(1, 5)
-                selected_products = random.sample(range(1, 11), min(num_items, 10))
-                
-                for product_id in selected_products:
-                    quantity = random.randint(1, 3)
-                    # Get product price (simplified - using index)
-                    unit_price = products[product_id-1][3]  # price from products list
-                    discount = random.choice([0, 0.05, 0.1, 0.15]) if random.random() < 0.3 else 0
-                    
-                    item_total = quantity * unit_price * (1 - discount)
-                    order_total += item_total
-                    
-                    order_items.append((sale_id, order_id, product_id, quantity, unit_price, discount))
-                    sale_id += 1
-                
-                # Insert order
-                cursor.execute("""
-                    INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?)
-                """, (order_id, customer_id, order_date.strftime('%Y-%m-%d'), 
-                     round(order_total, 2), status, shipping_city))
+            # Create order 
+            order_total = 0
+            
+            # 1-5 items per order
+            num_items = random.randint(1, 5)
+            selected_products = random.sample(range(1, 11), min(num_items, 10))
+            
+            for product_id in selected_products:
+                quantity = random.randint(1, 3)
+                unit_price = price_by_product[product_id]
+                discount = random.choice(DISCOUNTS) if random.random() < 0.3 else 0
                 
-                # Insert sales items
-                cursor.executemany("""
-                    INSERT INTO sales VALUES (?, ?, ?, ?, ?, ?)
-                """, order_items)
+                item_total = quantity * unit_price * (1 - discount)
+                order_total += item_total
                 
-                order_id += 1
+                sale_rows.append((sale_id, order_id, product_id, quantity, unit_price, discount))
+                sale_id += 1
+            
+            order_rows.append((order_id, customer_id, order_date,
+                               round(order_total, 2), status, shipping_city))
+            
+            order_id += 1
+        
+        bulk_insert(cursor, "orders", order_rows)
+        bulk_insert(cursor, "sales", sale_rows)
         
         print(f"   - Inserted {len(departments)} departments")
         print(f"   - Inserted {len(employees)} employees") 
-        print(f"   - Inserted 50 customers")
+        print(f"   - Inserted {len(customers)} customers")
         print(f"   - Inserted {len(products)} products")
         print(f"   - Inserted {order_id-1} orders with {sale_id-1} items")
     
+    def create_indexes(self, cursor):
+        """Create the unique email indexes and the join-key indexes"""
+        # Not executescript(): it would commit the open setup transaction first
+        cursor.execute("CREATE UNIQUE INDEX idx_employees_email ON employees(email)")
+        cursor.execute("CREATE UNIQUE INDEX idx_customers_email ON customers(email)")
+        cursor.execute("CREATE INDEX idx_employees_dept ON employees(dept_id)")
+        cursor.execute("CREATE INDEX idx_orders_customer ON orders(customer_id)")
+        cursor.execute("CREATE INDEX idx_sales_order ON sales(order_id)")
+        cursor.execute("CREATE INDEX idx_sales_product ON sales(product_id)")
+    
     def setup_pipeline(self):
         """Initialize DIVA-SQL pipeline with Gemini"""
         print("🤖 Initializing DIVA-SQL with Gemini...")
         
+        try:
+            from src.utils.gemini_client import create_gemini_client
+            from src.core.pipeline import DIVASQLPipeline
+            from src.utils.rate_limiter import RateLimiter
+        except ImportError as e:
+            print(f"❌ Import Error: {e}")
+            print("Make sure you've installed all dependencies:")
+            print("pip3 install google-generativeai")
+            sys.exit(1)
+        
         try:
             self.gemini_client = create_gemini_client(
                 api_key=self.api_key,
@@ -266,6 +409,13 @@ class ComprehensiveDemo:
                 self.gemini_client, 
                 model_name="gemini-2.0-flash"
             )
+            # The pipeline keeps per-query state, so worker threads each get their own
+            self._local = threading.local()
+            self._local.pipeline = self.pipeline
+            
+            # At most one query every 2 seconds; time spent generating counts
+            # toward the interval, so slow queries are not followed by a pause
+            self.rate_limiter = RateLimiter(30, 60)
             
             print("✅ DIVA-SQL pipeline initialized successfully")
             
@@ -273,28 +423,113 @@ class ComprehensiveDemo:
             print(f"❌ Error initializing pipeline: {e}")
             sys.exit(1)
     
-    def get_database_schema(self):
-        """Get database schema for DIVA-SQL"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        schema = {"tables": {}}
+    def setup_response_cache(self, cache_path: str = None):
+        """
+        Open the cache of earlier pipeline results, or disable caching if no path
         
-        # Get all tables
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = cursor.fetchall()
+        Repeated questions (the demo set, 'help' examples) are answered from
+        this SQLite file instead of going through the LLM again.
+        """
+        self.response_cache = None
+        if not cache_path:
+            return
+        
+        # Demo queries are generated on worker threads; the lock serializes access
+        self.response_cache = sqlite3.connect(cache_path, check_same_thread=False)
+        self._response_cache_lock = threading.Lock()
+        self.response_cache.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+        )
+        self.response_cache.commit()
+        
+        # The model and schema are fixed for the session, so they are hashed once
+        # and each lookup only feeds the query into a copy of this hasher
+        self._cache_hasher = hashlib.blake2b(digest_size=16)
+        self._cache_hasher.update(f"gemini-2.0-flash\0{json.dumps(self.schema, sort_keys=True)}\0".encode())
+    
+    def generate_sql(self, query: str, schema):
+        """Run the pipeline for a query, answering from the response cache when possible"""
+        if self.response_cache is None:
+            return self._generate_sql_rate_limited(query, schema)
+        
+        hasher = self._cache_hasher.copy()
+        hasher.update(" ".join(query.lower().split()).encode())
+        key = hasher.hexdigest()
+        
+        with self._response_cache_lock:
+            row = self.response_cache.execute(
+                "SELECT result FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is not None:
+            from src.core.pipeline import DIVAResult
+            return DIVAResult.from_dict(json.loads(row[0]))
+        
+        result = self._generate_sql_rate_limited(query, schema)
+        if result.final_sql:
+            # default=str covers non-JSON values (e.g. enums) in the logs
+            result_json = json.dumps(result.to_dict(), default=str)
+            with self._response_cache_lock:
+                self.response_cache.execute(
+                    "INSERT OR REPLACE INTO responses (key, result) VALUES (?, ?)",
+                    (key, result_json)
+                )
+                self.response_cache.commit()
+        return result
+    
+    def _get_pipeline(self):
+        """Return the calling thread's pipeline, creating it on first use"""
+        pipeline = getattr(self._local, 'pipeline', None)
+        if pipeline is None:
+            from src.core.pipeline import DIVASQLPipeline
+            pipeline = self._local.pipeline = DIVASQLPipeline(
+                self.gemini_client,
+                model_name="gemini-2.0-flash"
+            )
+        return pipeline
+    
+    def _generate_sql_rate_limited(self, query: str, schema):
+        """Run the pipeline once the rate limiter allows another request"""
+        waited = self.rate_limiter.acquire()
+        if waited:
+            print(f"⏳ Paused {waited:.1f}s to respect API rate limits")
+        return self._get_pipeline().generate_sql(query, schema)
+    
+    def execute_query(self, sql: str):
+        """
+        Run a generated query on the shared connection and return all rows
         
-        for (table_name,) in tables:
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-            schema["tables"][table_name] = [col[1] for col in columns]
+        The connection is query-only once set up, so a generated UPDATE,
+        DELETE or DROP fails instead of altering the demo data.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    
+    def get_database_schema(self):
+        """Get database schema for DIVA-SQL"""
+        return self.schema
+    
+    def _build_schema(self, cursor):
+        """Read table and column names from the database"""
+        # All tables and their columns in one query, in creation order
+        cursor.execute("""
+            SELECT m.name, p.name
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type = 'table' AND m.name != '_meta'
+            ORDER BY m.rowid, p.cid
+        """)
         
-        conn.close()
-        return schema
+        return {"tables": {
+            table_name: [column for _, column in rows]
+            for table_name, rows in groupby(cursor.fetchall(), key=itemgetter(0))
+        }}
     
     def display_schema(self):
         """Display database schema"""
-        schema = self.get_database_schema()
+        schema = self.schema
         print("\n📊 Database Schema:")
         print("=" * 50)
         
@@ -306,7 +541,7 @@ class ComprehensiveDemo:
     
     def run_demonstration_queries(self):
         """Run a set of demonstration queries"""
-        schema = self.get_database_schema()
+        schema = self.schema
         
         demo_queries = [
             {
@@ -339,80 +574,101 @@ class ComprehensiveDemo:
         print("\n🎯 Running Demonstration Queries")
         print("=" * 60)
         
+        total = len(demo_queries)
+        
+        # The queries are independent, so generate them all concurrently (still
+        # paced by the rate limiter). Each query's SQL is executed as soon as it
+        # is generated, on a single thread that owns the database connection,
+        # and the reports are printed in order while later queries are pending
+        print(f"⏳ Generating SQL for {total} queries...")
+        with ThreadPoolExecutor(max_workers=total) as pool, \
+                ThreadPoolExecutor(max_workers=1) as sql_pool:
+            
+            def generate_and_execute(query):
+                result = self.generate_sql(query, schema)
+                execution = sql_pool.submit(self.execute_query, result.final_sql) if result.final_sql else None
+                return result, execution
+            
+            generations = [pool.submit(generate_and_execute, query_info['query'])
+                           for query_info in demo_queries]
+            
+            successful = self._report_demonstration_queries(demo_queries, generations)
+        
+        print(f"\n📈 Demo Results Summary:")
+        print(f"✅ Successful queries: {successful}/{total} ({successful/total*100:.1f}%)")
+        
+        return successful, total
+    
+    def _report_demonstration_queries(self, demo_queries, generations):
+        """Print each demo query's generation and execution results in order"""
         successful = 0
         total = len(demo_queries)
         
-        for i, query_info in enumerate(demo_queries, 1):
-            print(f"\n🔍 Query {i}/{total}: {query_info['query']}")
-            print(f"📝 Description: {query_info['description']}")
-            print(f"🎚️  Complexity: {query_info['complexity']}")
-            print("-" * 50)
+        for i, (query_info, generation) in enumerate(zip(demo_queries, generations), 1):
+            # Each query's report is collected and written out as one block
+            lines = [
+                f"\n🔍 Query {i}/{total}: {query_info['query']}",
+                f"📝 Description: {query_info['description']}",
+                f"🎚️  Complexity: {query_info['complexity']}",
+                "-" * 50
+            ]
             
             try:
-                # Generate SQL using DIVA-SQL
-                result = self.pipeline.generate_sql(query_info['query'], schema)
+                # SQL generated by DIVA-SQL, already dispatched for execution
+                result, execution = generation.result()
                 
-                print(f"✅ Status: {result.status.value}")
-                print(f"📋 Generated SQL:")
-                print(f"   {result.final_sql}")
-                print(f"🎯 Confidence: {result.confidence_score:.2f}")
+                lines += [
+                    f"✅ Status: {result.status.value}",
+                    "📋 Generated SQL:",
+                    f"   {result.final_sql}",
+                    f"🎯 Confidence: {result.confidence_score:.2f}"
+                ]
                 
                 if result.semantic_dag:
-                    print(f"🧩 Semantic Decomposition: {len(result.semantic_dag.nodes)} nodes")
+                    lines.append(f"🧩 Semantic Decomposition: {len(result.semantic_dag.nodes)} nodes")
                     
                     # Show semantic breakdown
                     execution_order = result.semantic_dag.get_topological_order()
-                    print(f"🔄 Execution Steps:")
+                    lines.append("🔄 Execution Steps:")
                     for j, node_id in enumerate(execution_order, 1):
                         node = result.semantic_dag.nodes[node_id]
-                        print(f"   {j}. {node.node_type.value}: {node.description}")
+                        lines.append(f"   {j}. {node.node_type.value}: {node.description}")
                 
                 # Execute the query
                 if result.final_sql:
-                    conn = sqlite3.connect(self.db_path)
-                    cursor = conn.cursor()
-                    
                     try:
-                        cursor.execute(result.final_sql)
-                        results = cursor.fetchall()
-                        print(f"📊 Execution Result: {len(results)} rows returned")
+                        results = execution.result()
+                        lines.append(f"📊 Execution Result: {len(results)} rows returned")
                         
                         # Show sample results
                         if results:
-                            print(f"🗃️  Sample Results (first 3 rows):")
+                            lines.append("🗃️  Sample Results (first 3 rows):")
                             for k, row in enumerate(results[:3], 1):
-                                print(f"   {k}. {row}")
+                                lines.append(f"   {k}. {row}")
                         
                         successful += 1
                         
                     except Exception as exec_error:
-                        print(f"❌ SQL Execution Error: {exec_error}")
-                    finally:
-                        conn.close()
+                        lines.append(f"❌ SQL Execution Error: {exec_error}")
                 
             except Exception as e:
-                print(f"❌ Generation Error: {e}")
-            
-            print("-" * 50)
+                lines.append(f"❌ Generation Error: {e}")
             
-            # Add delay between queries to respect rate limits
-            if i < total:  # Don't delay after the last query
-                print("⏳ Pausing to respect API rate limits...")
-                time.sleep(2)  # 2-second delay between queries
-        
-        print(f"\n📈 Demo Results Summary:")
-        print(f"✅ Successful queries: {successful}/{total} ({successful/total*100:.1f}%)")
+            lines.append("-" * 50)
+            emit(*lines)
         
-        return successful, total
+        return successful
     
     def interactive_mode(self):
         """Interactive query mode"""
-        schema = self.get_database_schema()
+        schema = self.schema
         
-        print("\n🎮 Interactive Mode")
-        print("=" * 40)
-        print("Type natural language queries and see DIVA-SQL in action!")
-        print("Commands: 'schema' (show tables), 'quit' (exit), 'help' (show examples)")
+        emit(
+            "\n🎮 Interactive Mode",
+            "=" * 40,
+            "Type natural language queries and see DIVA-SQL in action!",
+            "Commands: 'schema' (show tables), 'quit' (exit), 'help' (show examples)"
+        )
         
         while True:
             try:
@@ -425,7 +681,6 @@ class ComprehensiveDemo:
                     self.display_schema()
                     continue
                 elif query.lower() == 'help':
-                    print("\n💡 Example queries you can try:")
                     examples = [
                         "Show all products with price above $100",
                         "What are the total sales by product category?", 
@@ -434,53 +689,52 @@ class ComprehensiveDemo:
                         "Show monthly sales trends",
                         "Find products that are low in stock"
                     ]
-                    for example in examples:
-                        print(f"   • {example}")
+                    emit("\n💡 Example queries you can try:",
+                         *(f"   • {example}" for example in examples))
                     continue
                 elif not query:
                     continue
                 
-                print(f"\n🤖 Processing: '{query}'")
-                print("⏳ Thinking...")
+                emit(f"\n🤖 Processing: '{query}'", "⏳ Thinking...")
                 
-                result = self.pipeline.generate_sql(query, schema)
+                result = self.generate_sql(query, schema)
                 
-                print(f"\n📝 Generated SQL:")
-                print(f"   {result.final_sql}")
-                print(f"🎯 Confidence: {result.confidence_score:.2f}")
-                print(f"⚡ Status: {result.status.value}")
+                lines = [
+                    "\n📝 Generated SQL:",
+                    f"   {result.final_sql}",
+                    f"🎯 Confidence: {result.confidence_score:.2f}",
+                    f"⚡ Status: {result.status.value}"
+                ]
                 
                 # Show semantic breakdown if available
                 if result.semantic_dag and len(result.semantic_dag.nodes) > 1:
-                    print(f"\n🧠 Semantic Reasoning:")
+                    lines.append("\n🧠 Semantic Reasoning:")
                     execution_order = result.semantic_dag.get_topological_order()
                     for j, node_id in enumerate(execution_order, 1):
                         node = result.semantic_dag.nodes[node_id]
-                        print(f"   {j}. {node.description}")
+                        lines.append(f"   {j}. {node.description}")
                 
                 # Execute query
                 if result.final_sql:
                     try:
-                        conn = sqlite3.connect(self.db_path)
-                        cursor = conn.cursor()
-                        cursor.execute(result.final_sql)
-                        results = cursor.fetchall()
-                        conn.close()
+                        results = self.execute_query(result.final_sql)
                         
-                        print(f"\n📊 Results: {len(results)} rows")
+                        lines.append(f"\n📊 Results: {len(results)} rows")
                         
                         if results:
-                            print("🗃️  Data:")
+                            lines.append("🗃️  Data:")
                             for i, row in enumerate(results[:10], 1):  # Show first 10
-                                print(f"   {i:2d}. {row}")
+                                lines.append(f"   {i:2d}. {row}")
                             
                             if len(results) > 10:
-                                print(f"   ... and {len(results) - 10} more rows")
+                                lines.append(f"   ... and {len(results) - 10} more rows")
                         else:
-                            print("   (No results)")
+                            lines.append("   (No results)")
                             
                     except Exception as e:
-                        print(f"❌ Execution Error: {e}")
+                        lines.append(f"❌ Execution Error: {e}")
+                
+                emit(*lines)
                 
             except KeyboardInterrupt:
                 print("\n👋 Goodbye!")
@@ -507,9 +761,23 @@ Environment Variables:
     parser.add_argument('--api-key', help='Google AI API key')
     parser.add_argument('--interactive', action='store_true', help='Run in interactive mode')
     parser.add_argument('--schema-only', action='store_true', help='Only show database schema')
+    parser.add_argument('--cache-path', default='diva_cache.db',
+                        help='SQLite file caching pipeline results across runs')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the LLM, bypassing the cache')
+    parser.add_argument('--persist', action='store_true',
+                        help='Save the demo database to demo_database.db and reuse it on later runs')
+    parser.add_argument('--reset-db', action='store_true',
+                        help='Rebuild the demo database even if a saved copy exists')
     
     args = parser.parse_args()
     
+    # The schema comes from the local database alone; no API key or pipeline needed
+    if args.schema_only:
+        demo = ComprehensiveDemo(None, persist_path="demo_database.db" if args.persist else None,
+                                 with_pipeline=False, reset_db=args.reset_db)
+        demo.display_schema()
+        return
+    
     # Get API key
     api_key = args.api_key or os.getenv('GOOGLE_API_KEY')
     
@@ -527,11 +795,9 @@ Environment Variables:
     print(f"📅 Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Initialize demo
-    demo = ComprehensiveDemo(api_key)
-    
-    if args.schema_only:
-        demo.display_schema()
-        return
+    demo = ComprehensiveDemo(api_key, cache_path=None if args.no_cache else args.cache_path,
+                             persist_path="demo_database.db" if args.persist else None,
+                             reset_db=args.reset_db)
     
     # Show schema
     demo.display_schema()
@@ -546,7 +812,10 @@ Environment Variables:
         print(f"📈 Final Success Rate: {successful}/{total} ({successful/total*100:.1f}%)")
         print("\nNext steps:")
         print("• Run in interactive mode: python3 run_diva_gemini_demo.py --interactive")
-        print("• Explore the database: open demo_database.db with SQLite browser")
+        if args.persist:
+            print("• Explore the database: open demo_database.db with SQLite browser")
+        else:
+            print("• Save the database for exploring: python3 run_diva_gemini_demo.py --persist")
         print("• Try your own queries and see DIVA-SQL's semantic decomposition!")
 
 
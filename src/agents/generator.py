@@ -5,36 +5,184 @@ This agent is responsible for generating SQL clauses from individual semantic no
 It focuses on translating single logical operations into precise SQL syntax.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, FrozenSet
+import asyncio
 import json
-from dataclasses import dataclass
+import re
+import sys
+from dataclasses import dataclass, field
 
 from ..core.semantic_dag import SemanticNode, NodeType
 from ..utils.prompts import GeneratorPrompts
+from ..utils.caching import IdentityCache, LRUCache
 
+# orjson parses several times faster; fall back to the stdlib if absent. Its
+# JSONDecodeError subclasses json.JSONDecodeError, so handlers work for both
+try:
+    from orjson import loads as _loads_json
+except ImportError:
+    _loads_json = json.loads
 
-@dataclass
+_NUMBER_PATTERN = re.compile(r'\d+')
+
+# Aggregate keywords, matched at the start of a word ("counts", "totals"), so
+# words like "discount" or "account" are not read as COUNT. One search finds
+# them all; when several occur the earliest function in _AGGREGATE_FUNCTIONS wins
+_AGGREGATE_KEYWORD_PATTERN = re.compile(r'\b(count|sum|total|average|avg|max|min)')
+_AGGREGATE_FUNCTIONS = {
+    "count": "COUNT",
+    "sum": "SUM",
+    "total": "SUM",
+    "average": "AVG",
+    "avg": "AVG",
+    "max": "MAX",
+    "min": "MIN"
+}
+_AGGREGATE_PRIORITY = {func: rank for rank, func in enumerate(("COUNT", "SUM", "AVG", "MAX", "MIN"))}
+
+_DESCENDING_PATTERN = re.compile(r'\b(?:desc|descending|highest|largest)\b')
+
+# SQL-like fragments to recover from a non-JSON LLM response, tried in order
+_SQL_CLAUSE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE | re.DOTALL)
+    for pattern in (
+        r'(SELECT\s+.+)',
+        r'(WHERE\s+.+)',
+        r'(JOIN\s+.+)',
+        r'(GROUP BY\s+.+)',
+        r'(ORDER BY\s+.+)',
+        r'(HAVING\s+.+)',
+        r'(LIMIT\s+\d+)'
+    )
+]
+
+
+# Alias strings for the usual number of tables, built once
+_TABLE_ALIASES = tuple(f"T{i}" for i in range(16))
+
+
+def _table_alias(number: int) -> str:
+    """Return the alias of the number-th table ("T1", "T2", ...)"""
+    if number < len(_TABLE_ALIASES):
+        return _TABLE_ALIASES[number]
+    return f"T{number}"
+
+
+# Extra chat completion arguments for requests whose answer is a JSON object:
+# JSON mode (which GeminiLLMClient maps to its own) and a fixed seed, for
+# clients that support one
+_STRUCTURED_REQUEST_OPTIONS = {"response_format": {"type": "json_object"}, "seed": 0}
+
+
+def _strip_code_fence(text: str) -> str:
+    """Remove a Markdown code fence (```json ... ```) around an LLM response"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text[3:]
+        if text.startswith("json"):
+            text = text[4:]
+        if text.endswith("```"):
+            text = text[:-3]
+    return text.strip()
+
+
+class _DeferredCompletion(BaseException):
+    """
+    Raised in place of an LLM call while generate_clauses collects prompts
+
+    Derived from BaseException so the generators' `except Exception` handlers
+    let it through to generate_clauses instead of turning it into a failure.
+    """
+
+
+# dataclass(slots=True) needs Python 3.10; older versions keep the __dict__
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class GenerationResult:
-    """Result of SQL clause generation"""
+    """Result of SQL clause generation, shared between nodes of the same shape"""
     success: bool
     sql_clause: Optional[str]
     explanation: Optional[str] = None
-    tables_used: List[str] = None
-    columns_used: List[str] = None
+    tables_used: Tuple[str, ...] = ()
+    columns_used: Tuple[str, ...] = ()
     confidence: float = 0.0
     error_message: Optional[str] = None
 
 
+@dataclass
+class SchemaIndex:
+    """Column lookups over a schema dict, built once per schema"""
+    tables: Dict[str, FrozenSet[str]]
+    id_columns: Dict[str, Tuple[str, ...]]  # columns ending in "ID", in schema order
+    _shared_id_columns: Dict[Tuple[str, str], Tuple[str, ...]] = field(default_factory=dict, repr=False)
+    
+    @classmethod
+    def from_dict(cls, database_schema: Dict[str, Any]) -> 'SchemaIndex':
+        """Index the tables of a {"tables": {name: [columns]}} schema"""
+        all_tables = database_schema.get("tables", {})
+        return cls(
+            tables={table: frozenset(columns) for table, columns in all_tables.items()},
+            id_columns={table: tuple(column for column in columns if column.endswith("ID"))
+                        for table, columns in all_tables.items()}
+        )
+    
+    def shared_id_columns(self, main_table: str, join_table: str) -> Tuple[str, ...]:
+        """ID columns of main_table that join_table also has, i.e. join key candidates"""
+        key = (main_table, join_table)
+        shared = self._shared_id_columns.get(key)
+        if shared is None:
+            join_columns = self.tables.get(join_table, frozenset())
+            shared = self._shared_id_columns[key] = tuple(
+                column for column in self.id_columns.get(main_table, ()) if column in join_columns
+            )
+        return shared
+
+
 class ClauseGenerator:
     """
     Agent responsible for generating SQL clauses from semantic nodes
     """
     
-    def __init__(self, llm_client, model_name: str = "gpt-4"):
+    def __init__(self, llm_client, model_name: str = "gpt-4", fallback_model_name: Optional[str] = None):
+        """
+        Args:
+            llm_client: LLM client (OpenAI-compatible chat completions interface)
+            model_name: Model used to correct clauses
+            fallback_model_name: Model used when the rule-based generators fall
+                back to the LLM; these are short structured answers, so a smaller,
+                faster model usually suffices. Defaults to model_name
+        """
         self.llm_client = llm_client
         self.model_name = model_name
+        self.fallback_model_name = fallback_model_name or model_name
         self.prompts = GeneratorPrompts()
         
+        # Raw LLM responses keyed by (model, temperature, structured, system
+        # prompt, user prompt). Together the prompts hold the schema, node and
+        # previous clauses, so an identical request (a repeated question, or the
+        # same step of a similar one) is answered without another call. The most
+        # recently used responses are kept
+        self._response_cache = LRUCache(maxsize=1024)
+        # Set by generate_clauses while it collects the (system prompt, prompt,
+        # model, temperature, structured) of the requests nodes would send
+        self._deferred_prompts: Optional[List[Tuple[str, str, str, float, bool]]] = None
+        
+        # Node-level schema projections, per schema and selected table names
+        self._projected_schemas = IdentityCache(maxsize=256)
+        
+        # SchemaIndex per schema
+        self._schema_indexes = IdentityCache()
+        
+        # Results the rule-based generators produced without the LLM, per schema
+        # and node shape; a node of the same shape (a retry, or a common step
+        # such as "top 10" in another query) reuses the result without redoing
+        # the keyword detection. _llm_requests tells which results qualify.
+        # Each schema keeps its most recently used shapes
+        self._rule_results = IdentityCache()
+        self._llm_requests = 0
+        
         # Template mappings for different node types
         self.node_type_templates = {
             NodeType.FILTER: self._generate_filter_clause,
@@ -68,14 +216,34 @@ class ClauseGenerator:
             if context and "previous_clauses" in context:
                 previous_clauses = context["previous_clauses"]
             
+            # A retry follows a clause that failed verification, so it must reach
+            # the model again; its response then replaces the cached one
+            refresh = bool(context and context.get("attempt"))
+            
             # Use specialized method if available, otherwise use general LLM approach
             if semantic_node.node_type in self.node_type_templates:
-                result = self.node_type_templates[semantic_node.node_type](
-                    semantic_node, database_schema, previous_clauses
+                rule_results = self._rule_results.get(
+                    database_schema, lambda: LRUCache(maxsize=4096)
+                )
+                
+                shape = (
+                    semantic_node.node_type,
+                    semantic_node.description,
+                    tuple(semantic_node.tables),
+                    tuple(semantic_node.columns),
+                    tuple(semantic_node.conditions)
                 )
+                result = rule_results.get(shape)
+                if result is None:
+                    llm_requests = self._llm_requests
+                    result = self.node_type_templates[semantic_node.node_type](
+                        semantic_node, database_schema, previous_clauses, refresh
+                    )
+                    if result.success and self._llm_requests == llm_requests:
+                        rule_results.put(shape, result)
             else:
                 result = self._generate_with_llm(
-                    semantic_node, database_schema, previous_clauses
+                    semantic_node, database_schema, previous_clauses, refresh
                 )
             
             return result
@@ -87,6 +255,77 @@ class ClauseGenerator:
                 error_message=f"Clause generation failed: {str(e)}"
             )
     
+    async def agenerate_clause(self,
+                               semantic_node: SemanticNode,
+                               database_schema: Dict[str, Any],
+                               context: Optional[Dict[str, Any]] = None,
+                               executor=None) -> GenerationResult:
+        """
+        Asynchronous counterpart of generate_clause
+        
+        The blocking LLM request runs in an executor, so an async caller can
+        gather the clauses of several generators and overlap their network
+        latency. A generator keeps per-call state, so concurrent calls should
+        go to separate generators, as the evaluation scripts do with one
+        pipeline per worker.
+        
+        Args:
+            semantic_node: The semantic node to generate SQL for
+            database_schema: Database schema information
+            context: Additional context (previous clauses, etc.)
+            executor: Executor to run the request in (default: the loop's)
+            
+        Returns:
+            GenerationResult containing the SQL clause or error information
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, self.generate_clause, semantic_node, database_schema, context
+        )
+    
+    def generate_clauses(self,
+                         semantic_nodes: List[SemanticNode],
+                         database_schema: Dict[str, Any],
+                         context: Optional[Dict[str, Any]] = None) -> List[GenerationResult]:
+        """
+        Generate SQL clauses for several independent nodes, e.g. one DAG layer
+        
+        Nodes the rule-based generators can handle cost no request. The LLM
+        prompts of the remaining nodes are sent together in a single request,
+        and each node's result is then built from its part of the response just
+        as generate_clause would build it. If the batched response cannot be
+        split, those nodes fall back to one request each.
+        
+        Args:
+            semantic_nodes: Nodes that do not depend on each other's clauses
+            database_schema: Database schema information
+            context: Additional context shared by all nodes
+            
+        Returns:
+            One GenerationResult per node, in order
+        """
+        if len(semantic_nodes) > 1:
+            # Dry run: record the prompts that would reach the LLM without sending them
+            self._deferred_prompts = []
+            try:
+                for semantic_node in semantic_nodes:
+                    try:
+                        self.generate_clause(semantic_node, database_schema, context)
+                    except _DeferredCompletion:
+                        pass
+                deferred_prompts = self._deferred_prompts
+            finally:
+                self._deferred_prompts = None
+            
+            if len(deferred_prompts) > 1:
+                self._complete_batch(database_schema, deferred_prompts)
+                # The batch has just answered these prompts; a retry must not skip it
+                if context and context.get("attempt"):
+                    context = {key: value for key, value in context.items() if key != "attempt"}
+        
+        return [self.generate_clause(semantic_node, database_schema, context)
+                for semantic_node in semantic_nodes]
+    
     def correct_clause(self, 
                       semantic_node: SemanticNode,
                       current_sql: str,
@@ -106,16 +345,17 @@ class ClauseGenerator:
         """
         try:
             prompt = self.prompts.get_correction_prompt(
-                semantic_node, current_sql, error_feedback, database_schema
+                semantic_node, current_sql, error_feedback
             )
             
-            response = self.llm_client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1
+            # A correction is only asked for after verification failed, so a
+            # cached answer would just repeat the rejected one
+            content = self._complete(
+                self._project_schema(database_schema, semantic_node), prompt,
+                model=self.model_name, temperature=0.1, refresh=True
             )
             
-            correction_data = json.loads(response.choices[0].message.content)
+            correction_data = _loads_json(content)
             
             return GenerationResult(
                 success=True,
@@ -131,38 +371,66 @@ class ClauseGenerator:
                 error_message=f"Clause correction failed: {str(e)}"
             )
     
+    async def acorrect_clause(self,
+                              semantic_node: SemanticNode,
+                              current_sql: str,
+                              error_feedback: str,
+                              database_schema: Dict[str, Any],
+                              executor=None) -> GenerationResult:
+        """
+        Asynchronous counterpart of correct_clause, see agenerate_clause
+        
+        Args:
+            semantic_node: The semantic node the SQL should implement
+            current_sql: The current (incorrect) SQL clause
+            error_feedback: Feedback from the verification agent
+            database_schema: Database schema information
+            executor: Executor to run the request in (default: the loop's)
+            
+        Returns:
+            GenerationResult with corrected SQL clause
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, self.correct_clause,
+            semantic_node, current_sql, error_feedback, database_schema
+        )
+    
     def _generate_with_llm(self, 
                           semantic_node: SemanticNode,
                           database_schema: Dict[str, Any],
-                          previous_clauses: List[str]) -> GenerationResult:
+                          previous_clauses: List[str],
+                          refresh: bool = False) -> GenerationResult:
         """
         Generate SQL clause using LLM with general prompt
+        
+        With refresh set the cached response is bypassed, see _complete.
         """
         prompt = self.prompts.get_clause_generation_prompt(
-            semantic_node, database_schema, previous_clauses
+            semantic_node, previous_clauses
         )
         
-        response = self.llm_client.chat.completions.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2
+        # Temperature 0 and JSON mode make the answer as repeatable as the client
+        # allows; clients without JSON mode still reach the fallback below
+        content = self._complete(
+            self._project_schema(database_schema, semantic_node), prompt,
+            model=self.fallback_model_name, temperature=0, structured=True, refresh=refresh
         )
         
         try:
-            generation_data = json.loads(response.choices[0].message.content)
+            generation_data = _loads_json(content)
             
             return GenerationResult(
                 success=True,
                 sql_clause=generation_data.get("sql_clause"),
                 explanation=generation_data.get("explanation"),
-                tables_used=generation_data.get("tables_used", []),
-                columns_used=generation_data.get("columns_used", []),
+                tables_used=tuple(generation_data.get("tables_used") or ()),
+                columns_used=tuple(generation_data.get("columns_used") or ()),
                 confidence=generation_data.get("confidence", 0.7)
             )
             
         except json.JSONDecodeError:
             # Fallback: try to extract SQL from raw response
-            content = response.choices[0].message.content
             sql_clause = self._extract_sql_from_text(content)
             
             return GenerationResult(
@@ -172,10 +440,139 @@ class ClauseGenerator:
                 confidence=0.5
             )
     
+    def _complete(self,
+                  database_schema: Dict[str, Any],
+                  prompt: str,
+                  model: str,
+                  temperature: float,
+                  structured: bool = False,
+                  refresh: bool = False) -> str:
+        """
+        Return the LLM response text for a prompt, reusing an earlier identical call
+        
+        The schema goes in the system message ahead of the prompt, so calls for
+        the same database share a prefix that provider prompt caching can reuse.
+        Structured requests ask for a JSON object with a fixed seed. With
+        refresh set the request is always sent, and its response replaces the
+        cached one.
+        """
+        self._llm_requests += 1
+        system_prompt = self.prompts.get_system_prompt(database_schema)
+        key = (model, temperature, structured, system_prompt, prompt)
+        if not refresh:
+            content = self._response_cache.get(key)
+            if content is not None:
+                return content
+        
+        if self._deferred_prompts is not None:
+            self._deferred_prompts.append((system_prompt, prompt, model, temperature, structured))
+            raise _DeferredCompletion()
+        
+        response = self.llm_client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            **(_STRUCTURED_REQUEST_OPTIONS if structured else {})
+        )
+        content = response.choices[0].message.content
+        self._response_cache.put(key, content)
+        return content
+    
+    def _complete_batch(self,
+                        database_schema: Dict[str, Any],
+                        prompts: List[Tuple[str, str, str, float, bool]]):
+        """
+        Answer several deferred requests with one request per request settings
+        
+        The batch is sent with the full schema, since its prompts may each have
+        been built for a different part of it. Each answer is cached under its
+        own request's key, where _complete finds it. Answers that cannot be
+        matched to their request are left out, so those are sent on their own later.
+        """
+        system_prompt = self.prompts.get_system_prompt(database_schema)
+        
+        by_settings: Dict[Tuple[str, float, bool], List[Tuple[str, str]]] = {}
+        for node_system_prompt, prompt, model, temperature, structured in prompts:
+            by_settings.setdefault((model, temperature, structured), []).append(
+                (node_system_prompt, prompt)
+            )
+        
+        for (model, temperature, structured), group in by_settings.items():
+            if len(group) == 1:
+                continue
+            
+            try:
+                response = self.llm_client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": self.prompts.get_batch_prompt(
+                            [prompt for _, prompt in group]
+                        )}
+                    ],
+                    temperature=temperature,
+                    **(_STRUCTURED_REQUEST_OPTIONS if structured else {})
+                )
+                answers = _loads_json(_strip_code_fence(response.choices[0].message.content))
+                answers = answers["responses"]
+            except Exception:
+                continue
+            
+            if not isinstance(answers, list) or len(answers) != len(group):
+                continue
+            
+            for (node_system_prompt, prompt), answer in zip(group, answers):
+                key = (model, temperature, structured, node_system_prompt, prompt)
+                self._response_cache.put(key, json.dumps(answer))
+    
+    def _get_schema_index(self, database_schema: Dict[str, Any]) -> SchemaIndex:
+        """Return the SchemaIndex of a schema, building it on first use"""
+        return self._schema_indexes.get(
+            database_schema, lambda: SchemaIndex.from_dict(database_schema)
+        )
+    
+    def _project_schema(self, database_schema: Dict[str, Any], semantic_node: SemanticNode) -> Dict[str, Any]:
+        """
+        Return the part of the schema relevant to a node, for its LLM prompts
+        
+        Keeps the tables the node names, the tables holding a column it names,
+        and the tables sharing an ID column with those (their join partners).
+        The full schema is used when the node names nothing found in it, or
+        when everything would be kept anyway.
+        """
+        all_tables = database_schema.get("tables", {})
+        wanted_tables = {table.lower() for table in semantic_node.tables}
+        wanted_columns = {column.split(".")[-1].lower() for column in semantic_node.columns}
+        
+        lowered = {table: {column.lower() for column in columns} for table, columns in all_tables.items()}
+        selected = {table for table, columns in lowered.items()
+                    if table.lower() in wanted_tables or not wanted_columns.isdisjoint(columns)}
+        if not selected:
+            return database_schema
+        
+        id_columns = {column for table in selected for column in lowered[table]
+                      if len(column) > 2 and column.endswith("id")}
+        names = tuple(table for table, columns in lowered.items()
+                      if table in selected or not id_columns.isdisjoint(columns))
+        if len(names) == len(all_tables):
+            return database_schema
+        
+        # The same projection is returned as the same dict, so its rendered
+        # prompt text is cached just like the full schema's
+        return self._projected_schemas.get(
+            database_schema,
+            lambda: {**database_schema, "tables": {table: all_tables[table] for table in names}},
+            key=names
+        )
+    
     def _generate_filter_clause(self, 
                               semantic_node: SemanticNode,
                               database_schema: Dict[str, Any],
-                              previous_clauses: List[str]) -> GenerationResult:
+                              previous_clauses: List[str],
+                              refresh: bool = False) -> GenerationResult:
         """
         Generate WHERE clause for filtering operations
         """
@@ -187,26 +584,25 @@ class ClauseGenerator:
             
             if not conditions and not columns:
                 # Use LLM as fallback
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             # Build WHERE clause
             where_parts = []
-            table_alias = f"T{len(tables)}" if tables else "T1"
+            table_alias = _table_alias(len(tables) or 1)
             
             # Simple rule-based generation for common patterns
-            description_lower = semantic_node.description.lower()
+            description_lower = semantic_node.description_lower
+            date_col = next((col for col in columns if "date" in col.lower()), None)
             
-            if "after" in description_lower and any("date" in col.lower() for col in columns):
+            if date_col is not None and "after" in description_lower:
                 # Date filtering
-                date_col = next((col for col in columns if "date" in col.lower()), columns[0])
                 if "2022" in description_lower:
                     where_parts.append(f"{table_alias}.{date_col} > '2022-01-01'")
                 elif "2023" in description_lower:
                     where_parts.append(f"{table_alias}.{date_col} > '2023-01-01'")
             
-            elif "before" in description_lower and any("date" in col.lower() for col in columns):
+            elif date_col is not None and "before" in description_lower:
                 # Date filtering (before)
-                date_col = next((col for col in columns if "date" in col.lower()), columns[0])
                 if "2022" in description_lower:
                     where_parts.append(f"{table_alias}.{date_col} < '2022-01-01'")
             
@@ -215,16 +611,16 @@ class ClauseGenerator:
                 if columns:
                     col = columns[0]
                     # Try to extract number from description
-                    import re
-                    numbers = re.findall(r'\d+', semantic_node.description)
+                    numbers = _NUMBER_PATTERN.findall(semantic_node.description)
                     if numbers:
                         where_parts.append(f"{table_alias}.{col} > {numbers[0]}")
             
             # Add explicit conditions
-            for condition in conditions:
-                if not condition.startswith(table_alias):
-                    condition = f"{table_alias}.{condition}"
-                where_parts.append(condition)
+            prefix = table_alias + "."
+            where_parts.extend(
+                condition if condition.startswith(table_alias) else prefix + condition
+                for condition in conditions
+            )
             
             if where_parts:
                 sql_clause = "WHERE " + " AND ".join(where_parts)
@@ -232,13 +628,13 @@ class ClauseGenerator:
                     success=True,
                     sql_clause=sql_clause,
                     explanation=f"Filter clause with {len(where_parts)} conditions",
-                    tables_used=tables,
-                    columns_used=columns,
+                    tables_used=tuple(tables),
+                    columns_used=tuple(columns),
                     confidence=0.8
                 )
             else:
                 # Fallback to LLM
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
         except Exception as e:
             return GenerationResult(
@@ -250,7 +646,8 @@ class ClauseGenerator:
     def _generate_join_clause(self, 
                             semantic_node: SemanticNode,
                             database_schema: Dict[str, Any],
-                            previous_clauses: List[str]) -> GenerationResult:
+                            previous_clauses: List[str],
+                            refresh: bool = False) -> GenerationResult:
         """
         Generate JOIN clause for table joining operations
         """
@@ -258,7 +655,7 @@ class ClauseGenerator:
             tables = semantic_node.tables
             
             if len(tables) < 2:
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             # Simple rule-based join generation
             # Assume first table is already in FROM, join the second
@@ -269,13 +666,13 @@ class ClauseGenerator:
             join_conditions = []
             
             # Check for foreign key relationships (simplified)
-            main_table_schema = database_schema.get("tables", {}).get(main_table, [])
-            join_table_schema = database_schema.get("tables", {}).get(join_table, [])
+            schema_index = self._get_schema_index(database_schema)
+            main_table_schema = schema_index.tables.get(main_table, frozenset())
+            join_table_schema = schema_index.tables.get(join_table, frozenset())
             
             # Look for ID columns
-            for col in main_table_schema:
-                if col.endswith("ID") and col in join_table_schema:
-                    join_conditions.append(f"T1.{col} = T2.{col}")
+            for col in schema_index.shared_id_columns(main_table, join_table):
+                join_conditions.append(f"T1.{col} = T2.{col}")
             
             # If no automatic match, look for common patterns
             if not join_conditions:
@@ -290,12 +687,12 @@ class ClauseGenerator:
                     success=True,
                     sql_clause=sql_clause,
                     explanation=f"Join between {main_table} and {join_table}",
-                    tables_used=tables,
+                    tables_used=tuple(tables),
                     confidence=0.8
                 )
             else:
                 # Fallback to LLM
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
         except Exception as e:
             return GenerationResult(
@@ -307,7 +704,8 @@ class ClauseGenerator:
     def _generate_group_clause(self, 
                              semantic_node: SemanticNode,
                              database_schema: Dict[str, Any],
-                             previous_clauses: List[str]) -> GenerationResult:
+                             previous_clauses: List[str],
+                             refresh: bool = False) -> GenerationResult:
         """
         Generate GROUP BY clause for grouping operations
         """
@@ -315,7 +713,7 @@ class ClauseGenerator:
             columns = semantic_node.columns
             
             if not columns:
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             # Build GROUP BY clause
             table_alias = "T1"  # Default alias
@@ -327,7 +725,7 @@ class ClauseGenerator:
                 success=True,
                 sql_clause=sql_clause,
                 explanation=f"Group by {len(columns)} columns",
-                columns_used=columns,
+                columns_used=tuple(columns),
                 confidence=0.9
             )
             
@@ -341,29 +739,25 @@ class ClauseGenerator:
     def _generate_aggregate_clause(self, 
                                  semantic_node: SemanticNode,
                                  database_schema: Dict[str, Any],
-                                 previous_clauses: List[str]) -> GenerationResult:
+                                 previous_clauses: List[str],
+                                 refresh: bool = False) -> GenerationResult:
         """
         Generate aggregate functions (COUNT, SUM, AVG, etc.)
         """
         try:
-            description_lower = semantic_node.description.lower()
+            description_lower = semantic_node.description_lower
             columns = semantic_node.columns
             
             # Determine aggregate function from description
-            agg_func = None
-            if "count" in description_lower:
-                agg_func = "COUNT"
-            elif "sum" in description_lower or "total" in description_lower:
-                agg_func = "SUM"
-            elif "average" in description_lower or "avg" in description_lower:
-                agg_func = "AVG"
-            elif "maximum" in description_lower or "max" in description_lower:
-                agg_func = "MAX"
-            elif "minimum" in description_lower or "min" in description_lower:
-                agg_func = "MIN"
+            agg_func = min(
+                (_AGGREGATE_FUNCTIONS[keyword]
+                 for keyword in _AGGREGATE_KEYWORD_PATTERN.findall(description_lower)),
+                key=_AGGREGATE_PRIORITY.__getitem__,
+                default=None
+            )
             
             if not agg_func:
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             # Build aggregate expression
             if agg_func == "COUNT":
@@ -375,13 +769,13 @@ class ClauseGenerator:
                 if columns:
                     sql_clause = f"{agg_func}(T1.{columns[0]})"
                 else:
-                    return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                    return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             return GenerationResult(
                 success=True,
                 sql_clause=sql_clause,
                 explanation=f"{agg_func} aggregation",
-                columns_used=columns,
+                columns_used=tuple(columns),
                 confidence=0.9
             )
             
@@ -395,7 +789,8 @@ class ClauseGenerator:
     def _generate_select_clause(self, 
                               semantic_node: SemanticNode,
                               database_schema: Dict[str, Any],
-                              previous_clauses: List[str]) -> GenerationResult:
+                              previous_clauses: List[str],
+                              refresh: bool = False) -> GenerationResult:
         """
         Generate SELECT clause for column selection
         """
@@ -404,7 +799,7 @@ class ClauseGenerator:
             tables = semantic_node.tables
             
             if not columns:
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             # Build SELECT clause
             table_alias = "T1"  # Default alias
@@ -422,8 +817,8 @@ class ClauseGenerator:
                 success=True,
                 sql_clause=sql_clause,
                 explanation=f"Select {len(columns)} columns",
-                tables_used=tables,
-                columns_used=columns,
+                tables_used=tuple(tables),
+                columns_used=tuple(columns),
                 confidence=0.9
             )
             
@@ -437,19 +832,20 @@ class ClauseGenerator:
     def _generate_order_clause(self, 
                              semantic_node: SemanticNode,
                              database_schema: Dict[str, Any],
-                             previous_clauses: List[str]) -> GenerationResult:
+                             previous_clauses: List[str],
+                             refresh: bool = False) -> GenerationResult:
         """
         Generate ORDER BY clause for sorting
         """
         try:
             columns = semantic_node.columns
-            description_lower = semantic_node.description.lower()
+            description_lower = semantic_node.description_lower
             
             if not columns:
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             # Determine sort direction
-            if any(word in description_lower for word in ["desc", "descending", "highest", "largest"]):
+            if _DESCENDING_PATTERN.search(description_lower):
                 direction = "DESC"
             else:
                 direction = "ASC"
@@ -464,7 +860,7 @@ class ClauseGenerator:
                 success=True,
                 sql_clause=sql_clause,
                 explanation=f"Order by {len(columns)} columns {direction}",
-                columns_used=columns,
+                columns_used=tuple(columns),
                 confidence=0.9
             )
             
@@ -478,7 +874,8 @@ class ClauseGenerator:
     def _generate_limit_clause(self, 
                              semantic_node: SemanticNode,
                              database_schema: Dict[str, Any],
-                             previous_clauses: List[str]) -> GenerationResult:
+                             previous_clauses: List[str],
+                             refresh: bool = False) -> GenerationResult:
         """
         Generate LIMIT clause for result limiting
         """
@@ -486,8 +883,7 @@ class ClauseGenerator:
             description = semantic_node.description
             
             # Extract number from description
-            import re
-            numbers = re.findall(r'\d+', description)
+            numbers = _NUMBER_PATTERN.findall(description)
             
             if numbers:
                 limit_value = numbers[0]
@@ -500,7 +896,7 @@ class ClauseGenerator:
                     confidence=0.9
                 )
             else:
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
         except Exception as e:
             return GenerationResult(
@@ -512,7 +908,8 @@ class ClauseGenerator:
     def _generate_having_clause(self, 
                               semantic_node: SemanticNode,
                               database_schema: Dict[str, Any],
-                              previous_clauses: List[str]) -> GenerationResult:
+                              previous_clauses: List[str],
+                              refresh: bool = False) -> GenerationResult:
         """
         Generate HAVING clause for aggregate filtering
         """
@@ -520,7 +917,7 @@ class ClauseGenerator:
             conditions = semantic_node.conditions
             
             if not conditions:
-                return self._generate_with_llm(semantic_node, database_schema, previous_clauses)
+                return self._generate_with_llm(semantic_node, database_schema, previous_clauses, refresh)
             
             # Build HAVING clause
             having_parts = []
@@ -547,22 +944,9 @@ class ClauseGenerator:
         """
         Extract SQL clause from raw text response (fallback method)
         """
-        # Simple regex to find SQL-like patterns
-        import re
-        
         # Look for common SQL keywords
-        sql_patterns = [
-            r'(SELECT\s+.+)',
-            r'(WHERE\s+.+)',
-            r'(JOIN\s+.+)',
-            r'(GROUP BY\s+.+)',
-            r'(ORDER BY\s+.+)',
-            r'(HAVING\s+.+)',
-            r'(LIMIT\s+\d+)'
-        ]
-        
-        for pattern in sql_patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        for pattern in _SQL_CLAUSE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
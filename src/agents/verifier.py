@@ -457,7 +457,7 @@ class VerificationAgent:
         
         # Basic semantic checks based on node type
         node_type = semantic_node.node_type
-        description = semantic_node.description.lower()
+        description = semantic_node.description_lower
         clause_upper = sql_clause.upper()
         
         # Check if SQL clause type matches semantic node type
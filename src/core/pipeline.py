@@ -53,6 +53,20 @@ class DIVAResult:
             "confidence_score": self.confidence_score,
             "generation_steps": self.generation_steps or []
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DIVAResult':
+        """Create result from dictionary representation"""
+        return cls(
+            status=PipelineStatus(data["status"]),
+            final_sql=data.get("final_sql"),
+            semantic_dag=SemanticDAG.from_dict(data["semantic_dag"]) if data.get("semantic_dag") else None,
+            execution_time=data.get("execution_time", 0.0),
+            verification_log=data.get("verification_log", []),
+            error_message=data.get("error_message"),
+            confidence_score=data.get("confidence_score", 0.0),
+            generation_steps=data.get("generation_steps", [])
+        )
 
 
 class DIVASQLPipeline:
@@ -81,7 +95,8 @@ class DIVASQLPipeline:
                  llm_client,
                  model_name: str = "gpt-4",
                  max_iterations: int = 3,
-                 confidence_threshold: float = 0.7):
+                 confidence_threshold: float = 0.7,
+                 fallback_model_name: Optional[str] = None):
         """
         Initialize the DIVA-SQL pipeline
         
@@ -90,6 +105,8 @@ class DIVASQLPipeline:
             model_name: Model to use for all agents
             max_iterations: Maximum correction iterations per node
             confidence_threshold: Minimum confidence for accepting results
+            fallback_model_name: Model for clauses the rule-based generators
+                hand to the LLM (defaults to model_name)
         """
         self.llm_client = llm_client
         self.model_name = model_name
@@ -98,7 +115,7 @@ class DIVASQLPipeline:
         
         # Initialize agents
         self.decomposer = SemanticDecomposer(llm_client, model_name)
-        self.generator = ClauseGenerator(llm_client, model_name)
+        self.generator = ClauseGenerator(llm_client, model_name, fallback_model_name)
         self.verifier = VerificationAgent(llm_client, model_name)
         self.prompts = PipelinePrompts()
         
@@ -212,44 +229,67 @@ class DIVASQLPipeline:
         for layer_idx, layer in enumerate(execution_layers):
             self._log_step(f"Processing execution layer {layer_idx + 1}: {len(layer)} nodes")
             
+            nodes = [node for node in map(self.current_dag.get_node, layer) if node]
+            
+            # Nodes in a layer do not depend on each other, so their first attempts
+            # are generated together from the clauses verified before the layer;
+            # the generator sends their LLM requests as one batch
+            first_results = [None] * len(nodes)
+            if len(nodes) > 1:
+                first_results = self.generator.generate_clauses(
+                    nodes, database_schema,
+                    self._generation_context(list(self.verified_clauses.values()), context)
+                )
+            
             # Process all nodes in the current layer
-            for node_id in layer:
-                node = self.current_dag.get_node(node_id)
-                if not node:
-                    continue
-                
-                success = self._process_node(node, database_schema, context)
+            for node, first_result in zip(nodes, first_results):
+                success = self._process_node(node, database_schema, context, first_result)
                 if not success:
-                    self._log_step(f"Failed to process node {node_id}")
+                    self._log_step(f"Failed to process node {node.id}")
                     return False
         
         return True
     
+    def _generation_context(self,
+                            previous_clauses: List[str],
+                            context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Context passed to the clause generator for a node"""
+        generation_context = {"previous_clauses": previous_clauses}
+        if context:
+            generation_context.update(context)
+        return generation_context
+    
     def _process_node(self, 
                      node: SemanticNode,
                      database_schema: Dict[str, Any],
-                     context: Optional[Dict[str, Any]]) -> bool:
+                     context: Optional[Dict[str, Any]],
+                     first_result: Optional[GenerationResult] = None) -> bool:
         """
         Process a single semantic node: generate clause and verify
+        
+        `first_result` is the node's already generated first attempt, if any
+        (see ClauseGenerator.generate_clauses); retries are generated here.
         """
         node_id = node.id
         self._log_step(f"Processing node: {node_id} ({node.node_type.value})")
         
         # Get context of previous clauses
-        generation_context = {
-            "previous_clauses": list(self.verified_clauses.values())
-        }
-        if context:
-            generation_context.update(context)
+        generation_context = self._generation_context(
+            list(self.verified_clauses.values()), context
+        )
         
         # Try generation and verification with retries
         for attempt in range(self.max_iterations):
             self._log_step(f"Node {node_id}: Attempt {attempt + 1}")
+            generation_context["attempt"] = attempt
             
             # Generate SQL clause
-            generation_result = self.generator.generate_clause(
-                node, database_schema, generation_context
-            )
+            if attempt == 0 and first_result is not None:
+                generation_result = first_result
+            else:
+                generation_result = self.generator.generate_clause(
+                    node, database_schema, generation_context
+                )
             
             if not generation_result.success:
                 self._log_step(f"Node {node_id}: Generation failed - {generation_result.error_message}")
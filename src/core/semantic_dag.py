@@ -7,6 +7,7 @@ the semantic decomposition of natural language queries as DAGs.
 
 from typing import Dict, List, Optional, Set, Tuple, Any
 from dataclasses import dataclass, field
+from functools import cached_property
 from enum import Enum
 import networkx as nx
 import json
@@ -42,6 +43,17 @@ class SemanticNode:
     error_details: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+    @cached_property
+    def description_lower(self) -> str:
+        """
+        Lowercased description for keyword matching
+
+        Computed on first use and kept, since a node's description does not
+        change after construction and the generator and verifier both read it,
+        on every correction attempt.
+        """
+        return self.description.lower()
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert node to dictionary representation"""
         return {
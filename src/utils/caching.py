@@ -0,0 +1,121 @@
+"""
+Caching utilities for DIVA-SQL
+
+This module provides the bounded caches used for LLM responses and for
+values derived from schema dicts, such as rendered prompt text and lookup
+indexes.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Bounded mapping that evicts the least recently used entry beyond `maxsize`
+
+    Usage:
+        responses = LRUCache(maxsize=1024)
+        responses.put(key, value)
+        value = responses.get(key)
+    """
+
+    def __init__(self, maxsize: int = 128):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of entries kept
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the value cached under key, or default"""
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        """Cache value under key, evicting the least recently used entry if full"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class IdentityCache:
+    """
+    Bounded LRU cache of values derived from an object, keyed by its identity
+
+    Schemas are plain dicts, so they cannot be hashed, and hashing their
+    contents would cost about as much as the work being cached. Entries are
+    keyed by id() instead. Each entry holds a reference to its object, so that
+    id cannot pass to another object while the entry exists. Beyond `maxsize`
+    entries the least recently used one is evicted.
+
+    The cached value is not rebuilt when the object changes in place. Treat
+    cached objects as read-only and derive changed versions from a copy.
+
+    Usage:
+        indexes = IdentityCache(maxsize=32)
+        index = indexes.get(schema, lambda: build_index(schema))
+    """
+
+    def __init__(self, maxsize: int = 32):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of entries kept
+        """
+        self.maxsize = maxsize
+        # Entries hold (obj, value), keeping obj alive so its id stays unique
+        self._entries = LRUCache(maxsize)
+
+    def get(self, obj: Any, build: Callable[[], Any], key: Tuple[Hashable, ...] = ()) -> Any:
+        """
+        Return the value cached for obj (and key), building it on a miss
+
+        Args:
+            obj: Object the value is derived from
+            build: Called without arguments to create the value on a miss
+            key: Further hashable parts of the key, for several values per object
+
+        Returns:
+            The cached or newly built value
+        """
+        entry_key = (id(obj),) + key
+        entry = self._entries.get(entry_key)
+        if entry is not None:
+            return entry[1]
+
+        # Built outside the lock; if two threads race, both values are equal
+        # and the later one is kept
+        value = build()
+        self._entries.put(entry_key, (obj, value))
+        return value
+
+    def clear(self):
+        """Remove every entry"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
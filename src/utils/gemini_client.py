@@ -6,6 +6,7 @@ This module provides integration with Google's Gemini API for the DIVA-SQL frame
 
 import google.generativeai as genai
 import os
+import re
 import time
 import logging
 from typing import Dict, Any, Optional
@@ -13,6 +14,32 @@ from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
+# Quota errors carry the server's suggested wait, e.g. "Please retry in 23.4s"
+# or a RetryInfo detail rendered as "retry_delay { seconds: 23 }"
+_RETRY_AFTER_PATTERN = re.compile(r"retry in ([\d.]+)\s*s|retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Return the wait suggested by a rate-limit error, if it carries one"""
+    match = _RETRY_AFTER_PATTERN.search(str(error))
+    if not match:
+        return None
+    return float(match.group(1) or match.group(2))
+
+
+# genai.configure discards the SDK's cached API clients together with their
+# gRPC channels, so it is only called again when the API key changes. All
+# clients created with the same key then share one long-lived HTTP/2 channel.
+_configured_api_key: Optional[str] = None
+
+
+def _configure_genai(api_key: str):
+    """Configure the Gemini SDK for api_key unless it already is"""
+    global _configured_api_key
+    if api_key != _configured_api_key:
+        genai.configure(api_key=api_key, transport="grpc")
+        _configured_api_key = api_key
+
 
 @dataclass
 class GeminiResponse:
@@ -51,8 +78,8 @@ class GeminiLLMClient:
                 "or pass api_key parameter"
             )
         
-        # Configure the API
-        genai.configure(api_key=self.api_key)
+        # Configure the API, keeping the existing connection for a known key
+        _configure_genai(self.api_key)
         
         self.model_name = model_name
         self.generation_config = generation_config or {
@@ -93,12 +120,39 @@ class GeminiLLMClient:
         except Exception as e:
             logger.error(f"Failed to initialize Gemini model: {e}")
             raise
+        
+        # Models bound to a system instruction, keyed by the instruction text
+        self._instruction_models: Dict[str, Any] = {}
+    
+    def _get_model(self, system_instruction: Optional[str] = None):
+        """
+        Return the model to use for a request
+        
+        System instructions are passed to Gemini as such rather than pasted in
+        front of the prompt, so a fixed instruction (e.g. a schema) forms an
+        identical request prefix that Gemini's context caching can reuse. One
+        model object is kept per distinct instruction.
+        """
+        if not system_instruction:
+            return self.model
+        
+        model = self._instruction_models.get(system_instruction)
+        if model is None:
+            model = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings,
+                system_instruction=system_instruction
+            )
+            self._instruction_models[system_instruction] = model
+        return model
     
     def generate_text(self, 
                      prompt: str, 
                      system_instruction: Optional[str] = None,
                      max_retries: int = 3,
-                     retry_delay: float = 1.0) -> GeminiResponse:
+                     retry_delay: float = 1.0,
+                     generation_config: Optional[Dict] = None) -> GeminiResponse:
         """
         Generate text using Gemini API
         
@@ -107,18 +161,18 @@ class GeminiLLMClient:
             system_instruction: Optional system instruction
             max_retries: Number of retry attempts
             retry_delay: Delay between retries
+            generation_config: Overrides of the client's generation parameters
+                for this request
             
         Returns:
             GeminiResponse with generated content
         """
-        full_prompt = prompt
-        if system_instruction:
-            full_prompt = f"{system_instruction}\n\n{prompt}"
+        model = self._get_model(system_instruction)
         
         for attempt in range(max_retries):
             try:
                 logger.debug(f"Generating text (attempt {attempt + 1})")
-                response = self.model.generate_content(full_prompt)
+                response = model.generate_content(prompt, generation_config=generation_config)
                 
                 # Handle the response
                 if response.text:
@@ -138,7 +192,12 @@ class GeminiLLMClient:
             except Exception as e:
                 logger.error(f"Error generating text (attempt {attempt + 1}): {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (2 ** attempt))  # Exponential backoff
+                    # Exponential backoff, extended to the server's retry-after hint on quota errors
+                    delay = retry_delay * (2 ** attempt)
+                    suggested = _retry_after(e)
+                    if suggested is not None:
+                        delay = max(delay, suggested)
+                    time.sleep(delay)
                     continue
                 else:
                     raise Exception(f"Failed to generate text after {max_retries} attempts: {e}")
@@ -160,7 +219,9 @@ class GeminiLLMClient:
             Args:
                 messages: List of message dictionaries
                 model: Model name (optional, uses client default)
-                **kwargs: Additional parameters
+                **kwargs: Additional parameters; temperature and
+                    response_format={"type": "json_object"} map to Gemini's
+                    temperature and JSON mode, others (e.g. seed) are ignored
                 
             Returns:
                 Response object compatible with OpenAI format
@@ -182,10 +243,17 @@ class GeminiLLMClient:
             
             prompt = "\n".join(prompt_parts)
             
+            generation_config = {}
+            if kwargs.get('temperature') is not None:
+                generation_config['temperature'] = kwargs['temperature']
+            if (kwargs.get('response_format') or {}).get('type') == 'json_object':
+                generation_config['response_mime_type'] = 'application/json'
+            
             # Generate response
             response = self.parent.generate_text(
                 prompt=prompt,
-                system_instruction=system_instruction
+                system_instruction=system_instruction,
+                generation_config=generation_config or None
             )
             
             # Return OpenAI-compatible response
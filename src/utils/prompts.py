@@ -8,6 +8,68 @@ in the DIVA-SQL framework.
 from typing import Dict, Any, List
 import json
 
+from .caching import IdentityCache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Payloads are embedded as compact JSON: the indentation only cost tokens
+_COMPACT_SEPARATORS = (",", ":")
+
+# Longer string values in clipped payloads (e.g. cells of sample result rows)
+# are cut to this many characters
+MAX_PROMPT_VALUE_LENGTH = 50
+
+
+def _clip_values(value: Any) -> Any:
+    """Return value with every string longer than MAX_PROMPT_VALUE_LENGTH shortened"""
+    if isinstance(value, str):
+        if len(value) > MAX_PROMPT_VALUE_LENGTH:
+            return value[:MAX_PROMPT_VALUE_LENGTH] + "…"
+        return value
+    if isinstance(value, dict):
+        return {key: _clip_values(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clip_values(item) for item in value]
+    return value
+
+
+def render_prompt_json(payload: Any, clip_values: bool = False) -> str:
+    """
+    Render a payload as compact JSON for inclusion in a prompt
+
+    Identifiers and SQL must reach the model verbatim; clip_values is only
+    for data such as execution results, where long values add nothing.
+    """
+    if clip_values:
+        payload = _clip_values(payload)
+    return json.dumps(payload, separators=_COMPACT_SEPARATORS, ensure_ascii=False)
+
+
+# Rendered schema strings for the most recently used schemas
+_SCHEMA_PROMPT_CACHE = IdentityCache(maxsize=64)
+
+
+def _format_schema(database_schema: Dict[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(database_schema).decode()
+    return json.dumps(database_schema, separators=_COMPACT_SEPARATORS, ensure_ascii=False)
+
+
+def render_schema_prompt(database_schema: Dict[str, Any]) -> str:
+    """
+    Render a database schema for inclusion in a prompt
+
+    The benchmark loaders intern schemas by db_id, so all examples of a
+    database share one schema dict and it is formatted once instead of once
+    per prompt. The text is cached per dict object, so a schema must not be
+    changed in place once rendered.
+    """
+    return _SCHEMA_PROMPT_CACHE.get(database_schema, lambda: _format_schema(database_schema))
+
 
 class DecomposerPrompts:
     """Prompt templates for the Semantic Decomposer Agent"""
@@ -43,8 +105,8 @@ Respond only with valid JSON.
                                           database_schema: Dict[str, Any],
                                           query_analysis: Dict[str, Any]) -> str:
         """Generate prompt for identifying semantic components"""
-        schema_str = json.dumps(database_schema, indent=2)
-        analysis_str = json.dumps(query_analysis, indent=2)
+        schema_str = render_schema_prompt(database_schema)
+        analysis_str = render_prompt_json(query_analysis)
         
         return f"""
 You are an expert at breaking down complex SQL queries into logical steps. 
@@ -93,7 +155,7 @@ Respond only with valid JSON.
                             database_schema: Dict[str, Any]) -> str:
         """Generate prompt for refining a DAG based on feedback"""
         dag_str = dag.to_json()
-        schema_str = json.dumps(database_schema, indent=2)
+        schema_str = render_schema_prompt(database_schema)
         
         return f"""
 You are an expert at refining semantic query decompositions. 
@@ -139,14 +201,31 @@ Respond only with valid JSON.
 class GeneratorPrompts:
     """Prompt templates for the Clause Generator Agent"""
     
+    def get_system_prompt(self, database_schema: Dict[str, Any]) -> str:
+        """
+        Generate the system prompt shared by clause generation and correction
+        
+        It holds only the role and the schema, so every request against a schema
+        starts with the same text that provider-side prompt caches can reuse;
+        the node-specific content goes in the user prompt.
+        """
+        schema_str = render_schema_prompt(database_schema)
+        
+        return f"""
+You are an expert SQL generator. You write and fix individual SQL clauses that implement single semantic operations of a larger query.
+
+Database Schema:
+{schema_str}
+
+Respond only with valid JSON.
+"""
+    
     def get_clause_generation_prompt(self, 
                                    semantic_node,
-                                   database_schema: Dict[str, Any],
                                    previous_clauses: List[str] = None) -> str:
-        """Generate prompt for creating SQL clause from semantic node"""
-        schema_str = json.dumps(database_schema, indent=2)
+        """Generate the user prompt for creating SQL clause from semantic node"""
         node_dict = semantic_node.to_dict()
-        node_str = json.dumps(node_dict, indent=2)
+        node_str = render_prompt_json(node_dict)
         
         previous_context = ""
         if previous_clauses:
@@ -156,16 +235,6 @@ Previous SQL clauses in this query:
 """
         
         return f"""
-You are an expert SQL generator. Generate a precise SQL clause for the given semantic operation.
-
-Semantic Node:
-{node_str}
-
-Database Schema:
-{schema_str}
-
-{previous_context}
-
 Generate a SQL clause that implements exactly what the semantic node describes.
 
 Guidelines:
@@ -184,21 +253,28 @@ Provide your response in the following JSON format:
     "confidence": <0.0 to 1.0>
 }}
 
-Respond only with valid JSON.
-"""
+Semantic Node:
+{node_str}
+{previous_context}"""
 
     def get_correction_prompt(self, 
                             semantic_node,
                             current_sql: str,
-                            error_feedback: str,
-                            database_schema: Dict[str, Any]) -> str:
-        """Generate prompt for correcting SQL based on verification feedback"""
-        schema_str = json.dumps(database_schema, indent=2)
+                            error_feedback: str) -> str:
+        """Generate the user prompt for correcting SQL based on verification feedback"""
         node_dict = semantic_node.to_dict()
-        node_str = json.dumps(node_dict, indent=2)
+        node_str = render_prompt_json(node_dict)
         
         return f"""
-You are an expert SQL debugger. Fix the SQL clause based on the verification feedback.
+Fix the SQL clause based on the verification feedback. Analyze the feedback and generate a corrected SQL clause.
+
+Provide your response in the following JSON format:
+{{
+    "corrected_sql": "<fixed SQL clause>",
+    "changes_made": ["change1", "change2"],
+    "explanation": "<explanation of the corrections>",
+    "confidence": <0.0 to 1.0>
+}}
 
 Semantic Node (what should be implemented):
 {node_str}
@@ -208,21 +284,19 @@ Current SQL Clause:
 
 Verification Feedback:
 {error_feedback}
+"""
 
-Database Schema:
-{schema_str}
-
-Analyze the feedback and generate a corrected SQL clause.
-
-Provide your response in the following JSON format:
-{{
-    "corrected_sql": "<fixed SQL clause>",
-    "changes_made": ["change1", "change2"],
-    "explanation": "<explanation of the corrections>",
-    "confidence": <0.0 to 1.0>
-}}
+    def get_batch_prompt(self, prompts: List[str]) -> str:
+        """Generate a user prompt answering several generator prompts at once"""
+        requests = "\n".join(
+            f"### Request {i}\n{prompt.strip()}\n" for i, prompt in enumerate(prompts, 1)
+        )
+        
+        return f"""
+Answer each of the following {len(prompts)} independent requests.
 
-Respond only with valid JSON.
+{requests}
+Respond with a JSON object of the form {{"responses": [...]}}, where the array holds exactly {len(prompts)} elements: the JSON response to each request, in the same order.
 """
 
 
@@ -234,9 +308,9 @@ class VerifierPrompts:
                                   sql_clause: str,
                                   database_schema: Dict[str, Any]) -> str:
         """Generate prompt for checking schema alignment"""
-        schema_str = json.dumps(database_schema, indent=2)
+        schema_str = render_schema_prompt(database_schema)
         node_dict = semantic_node.to_dict()
-        node_str = json.dumps(node_dict, indent=2)
+        node_str = render_prompt_json(node_dict)
         
         return f"""
 You are an expert SQL validator. Check if the SQL clause correctly implements the semantic intent using the proper schema.
@@ -323,7 +397,7 @@ Respond only with valid JSON.
                                   sql_clause: str,
                                   execution_result: Dict[str, Any]) -> str:
         """Generate prompt for analyzing execution results"""
-        result_str = json.dumps(execution_result, indent=2)
+        result_str = render_prompt_json(execution_result, clip_values=True)
         
         return f"""
 You are an expert SQL execution analyzer. Analyze the execution result to determine if it's reasonable.
@@ -367,7 +441,7 @@ class PipelinePrompts:
                                    verified_clauses: Dict[str, str]) -> str:
         """Generate prompt for composing final SQL from verified clauses"""
         dag_str = dag.to_json()
-        clauses_str = json.dumps(verified_clauses, indent=2)
+        clauses_str = render_prompt_json(verified_clauses)
         
         return f"""
 You are an expert SQL composer. Combine the verified SQL clauses into a final, complete SQL query.
@@ -0,0 +1,108 @@
+"""
+Rate limiting utilities for DIVA-SQL
+
+This module provides request pacing for evaluation scripts that issue many
+concurrent calls against rate-limited LLM APIs.
+"""
+
+import asyncio
+import threading
+import time
+
+
+class AsyncRateLimiter:
+    """
+    Asyncio rate limiter allowing at most `max_rate` acquisitions per `time_period` seconds
+
+    Each acquisition reserves the next free slot, so requests that are already
+    waiting on the network do not pay an additional fixed delay.
+
+    Usage:
+        limiter = AsyncRateLimiter(20, 60)
+        async with limiter:
+            ...
+    """
+
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        """
+        Initialize the rate limiter
+
+        Args:
+            max_rate: Maximum number of acquisitions per time period
+            time_period: Length of the time period in seconds
+        """
+        if max_rate <= 0:
+            raise ValueError("max_rate must be positive")
+
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._interval = time_period / max_rate
+        self._next_slot = time.monotonic()
+
+    async def acquire(self):
+        """Wait until the next request slot is available"""
+        # Reserve the slot before sleeping; there is no await in between,
+        # so concurrent tasks on the same loop never claim the same slot
+        now = time.monotonic()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self._interval
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class RateLimiter:
+    """
+    Blocking counterpart of AsyncRateLimiter for sequential loops
+
+    Time already spent on a request counts toward the interval, so the
+    caller only sleeps when it is actually ahead of the allowed rate. Slots
+    are reserved under a lock, so worker threads can share one limiter.
+
+    Usage:
+        limiter = RateLimiter(20, 60)
+        for item in items:
+            limiter.acquire()
+            ...
+    """
+
+    def __init__(self, max_rate: float, time_period: float = 60.0):
+        """
+        Initialize the rate limiter
+
+        Args:
+            max_rate: Maximum number of acquisitions per time period
+            time_period: Length of the time period in seconds
+        """
+        if max_rate <= 0:
+            raise ValueError("max_rate must be positive")
+
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._interval = time_period / max_rate
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Wait until the next request slot is available
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+
+        if wait > 0:
+            time.sleep(wait)
+            return wait
+        return 0.0
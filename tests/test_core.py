@@ -9,8 +9,31 @@ from pathlib import Path
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
+import json
+import sqlite3
+from types import SimpleNamespace
+
 from src.core.semantic_dag import SemanticDAG, SemanticNode, NodeType
+from src.core.pipeline import DIVASQLPipeline
+from src.agents.generator import ClauseGenerator, GenerationResult
+from src.agents.verifier import VerificationResult, VerificationStatus
 from src.utils.error_taxonomy import ErrorTaxonomy, analyze_sql_errors
+from evaluation.benchmark_eval import _result_summary
+from evaluation.framework import SQLExecutor
+
+
+class RecordingLLMClient:
+    """OpenAI-style client stub that records requests and answers via a callback"""
+    
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+    
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        content = self.reply(kwargs["messages"][-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
 
 
 class TestSemanticDAG(unittest.TestCase):
@@ -200,6 +223,259 @@ class TestNodeTypes(unittest.TestCase):
         self.assertEqual(restored_node.conditions, node.conditions)
 
 
+class TestResultSummary(unittest.TestCase):
+    """Test cases for the execution-match summaries of benchmark_eval"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.conn = sqlite3.connect(":memory:")
+    
+    def tearDown(self):
+        self.conn.close()
+    
+    def summary(self, sql, expected=None):
+        """Summarize the rows of a query"""
+        return _result_summary(self.conn.execute(sql), expected)
+    
+    def assertSameResult(self, sql1, sql2):
+        self.assertEqual(self.summary(sql1), self.summary(sql2))
+    
+    def assertDifferentResult(self, sql1, sql2):
+        self.assertNotEqual(self.summary(sql1), self.summary(sql2))
+    
+    def test_row_order_ignored(self):
+        """Results with the same rows in another order match"""
+        self.assertSameResult("VALUES (1, 'a'), (2, 'b')", "VALUES (2, 'b'), (1, 'a')")
+    
+    def test_column_order_matters(self):
+        """Swapping the values within a row changes the result"""
+        self.assertDifferentResult("VALUES (1, 2)", "VALUES (2, 1)")
+    
+    def test_duplicate_rows_counted(self):
+        """Results are compared as multisets, not sets"""
+        self.assertDifferentResult("VALUES (1), (1)", "VALUES (1)")
+        self.assertDifferentResult("VALUES (1), (1), (2)", "VALUES (1), (2), (2)")
+        self.assertSameResult("VALUES (1), (2), (1)", "VALUES (1), (1), (2)")
+    
+    def test_int_and_float_equal(self):
+        """1 and 1.0 compare equal, as they do in Python"""
+        self.assertSameResult("VALUES (1)", "VALUES (1.0)")
+        self.assertDifferentResult("VALUES (1)", "VALUES ('1')")
+        self.assertDifferentResult("VALUES (1.5)", "VALUES (1)")
+    
+    def test_distinct_values_differ(self):
+        """Values whose built-in hashes collide or mix poorly still differ"""
+        self.assertDifferentResult("VALUES (-1)", "VALUES (-2)")
+        self.assertDifferentResult("VALUES (1), (2)", "VALUES (0), (3)")
+        self.assertDifferentResult("VALUES ('1')", "VALUES (X'31')")
+    
+    def test_null_values(self):
+        """NULL only matches NULL"""
+        self.assertSameResult("VALUES (NULL, 1)", "VALUES (NULL, 1)")
+        self.assertDifferentResult("VALUES (NULL)", "VALUES (0)")
+        self.assertDifferentResult("VALUES (NULL)", "VALUES ('')")
+    
+    def test_column_count_mismatch(self):
+        """A different column count stops before reading any row"""
+        expected = self.summary("VALUES (1)")
+        column_count, row_count, digest = self.summary("VALUES (1, 1)", expected)
+        self.assertEqual(column_count, 2)
+        self.assertIsNone(row_count)
+        self.assertIsNone(digest)
+    
+    def test_extra_rows_stop_early(self):
+        """More rows than expected give no digest"""
+        expected = self.summary("VALUES (1)")
+        self.assertEqual(self.summary("VALUES (1), (1)", expected), (1, 2, None))
+
+
+class TestCompareResults(unittest.TestCase):
+    """Test cases for result comparison in the evaluation framework"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.executor = SQLExecutor(":memory:")
+    
+    def test_row_order_ignored(self):
+        """Results with the same rows in another order match"""
+        self.assertTrue(self.executor.compare_results([(1, "a"), (2, "b")], [(2, "b"), (1, "a")]))
+    
+    def test_duplicate_rows_counted(self):
+        """Results are compared as multisets, not sets"""
+        self.assertFalse(self.executor.compare_results([(1,), (1,), (2,)], [(1,), (2,), (2,)]))
+        self.assertFalse(self.executor.compare_results([(1,), (1,)], [(1,)]))
+        self.assertTrue(self.executor.compare_results([(1,), (2,), (1,)], [(1,), (1,), (2,)]))
+    
+    def test_int_and_float_equal(self):
+        """1 and 1.0 compare equal, as they do in Python"""
+        self.assertTrue(self.executor.compare_results([(1,)], [(1.0,)]))
+        self.assertFalse(self.executor.compare_results([(1,)], [("1",)]))
+    
+    def test_null_values(self):
+        """None only matches None"""
+        self.assertTrue(self.executor.compare_results([(None, 1)], [(None, 1)]))
+        self.assertFalse(self.executor.compare_results([(None,)], [(0,)]))
+    
+    def test_column_count_mismatch(self):
+        """Rows with a different number of columns do not match"""
+        self.assertFalse(self.executor.compare_results([(1,)], [(1, 1)]))
+    
+    def test_bare_values(self):
+        """Bare values are treated as one-column rows"""
+        self.assertTrue(self.executor.compare_results([1, 2], [(2,), (1,)]))
+
+
+class TestClauseGeneratorKeywords(unittest.TestCase):
+    """Test cases for keyword detection in the rule-based clause generators"""
+    
+    # Description -> aggregate clause; None means no keyword was found and the
+    # node was handed to the LLM
+    AGGREGATE_CASES = [
+        ("Count the employees", "COUNT(T1.Salary)"),
+        ("Total salary", "SUM(T1.Salary)"),
+        ("Totals per department", "SUM(T1.Salary)"),
+        ("Counts of hires", "COUNT(T1.Salary)"),
+        ("Average salary", "AVG(T1.Salary)"),
+        ("Highest (max) salary", "MAX(T1.Salary)"),
+        ("Minimum salary", "MIN(T1.Salary)"),
+        # Precedence when several keywords occur: COUNT, SUM, AVG, MAX, MIN
+        ("Minimum of the total", "SUM(T1.Salary)"),
+        ("Max of the average", "AVG(T1.Salary)"),
+        ("Total count", "COUNT(T1.Salary)"),
+        # Keywords must start a word
+        ("Apply the discount", None),
+        ("Account balance", None),
+        ("Admin users", None),
+        ("Headcount", None),
+        ("Subtotal", None),
+    ]
+    
+    # Description -> sort direction
+    ORDER_CASES = [
+        ("Sort by salary descending", "DESC"),
+        ("Sort by salary desc", "DESC"),
+        ("Highest salary first", "DESC"),
+        ("Largest departments first", "DESC"),
+        ("Sort by salary", "ASC"),
+        ("Sort by description", "ASC"),
+        ("Sort in descend order", "ASC"),
+    ]
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.schema = {"tables": {"Employees": ["EmpID", "Salary"]}}
+        self.generator = ClauseGenerator(
+            RecordingLLMClient(lambda prompt: json.dumps({"sql_clause": None}))
+        )
+    
+    def generate(self, node_type, description):
+        """Generate the clause of a node over the Salary column"""
+        node = SemanticNode("node", node_type, description, columns=["Salary"])
+        return self.generator.generate_clause(node, self.schema).sql_clause
+    
+    def test_aggregate_keywords(self):
+        """Aggregate functions follow keyword precedence and word boundaries"""
+        for description, expected in self.AGGREGATE_CASES:
+            with self.subTest(description=description):
+                self.assertEqual(self.generate(NodeType.AGGREGATE, description), expected)
+    
+    def test_order_direction(self):
+        """Only whole descending words select DESC"""
+        for description, direction in self.ORDER_CASES:
+            with self.subTest(description=description):
+                self.assertEqual(self.generate(NodeType.ORDER, description),
+                                 f"ORDER BY T1.Salary {direction}")
+
+
+class TestClauseGeneratorBatching(unittest.TestCase):
+    """Test cases for batched clause generation of sibling nodes"""
+    
+    def setUp(self):
+        """Set up test fixtures"""
+        self.schema = {"tables": {"Employees": ["EmpID", "Name", "DeptID"]}}
+        # Subquery nodes have no rule-based generator, so they always need the LLM
+        self.nodes = [
+            SemanticNode(f"sub{i}", NodeType.SUBQUERY, f"Subquery number {i}")
+            for i in range(2)
+        ]
+    
+    @staticmethod
+    def single_answer(prompt):
+        """Answer a single-node prompt with the number of the node it names"""
+        number = "1" if "Subquery number 1" in prompt else "0"
+        return json.dumps({"sql_clause": f"SINGLE {number}", "confidence": 0.9})
+    
+    def test_batch_split(self):
+        """Sibling prompts go out as one request and each node gets its own answer"""
+        def reply(prompt):
+            self.assertIn("### Request", prompt)
+            return json.dumps({"responses": [
+                {"sql_clause": "BATCH 0", "confidence": 0.9},
+                {"sql_clause": "BATCH 1", "confidence": 0.9}
+            ]})
+        
+        client = RecordingLLMClient(reply)
+        results = ClauseGenerator(client).generate_clauses(self.nodes, self.schema)
+        
+        self.assertEqual(len(client.requests), 1)
+        self.assertEqual([r.sql_clause for r in results], ["BATCH 0", "BATCH 1"])
+    
+    def test_batch_wrong_length_falls_back(self):
+        """A batch answer of the wrong length is discarded for one request per node"""
+        def reply(prompt):
+            if "### Request" in prompt:
+                return json.dumps({"responses": [{"sql_clause": "BATCH 0"}]})
+            return self.single_answer(prompt)
+        
+        client = RecordingLLMClient(reply)
+        results = ClauseGenerator(client).generate_clauses(self.nodes, self.schema)
+        
+        self.assertEqual(len(client.requests), 3)
+        self.assertEqual([r.sql_clause for r in results], ["SINGLE 0", "SINGLE 1"])
+    
+    def test_retry_bypasses_cache(self):
+        """A retry reaches the LLM again instead of reusing the cached answer"""
+        client = RecordingLLMClient(self.single_answer)
+        generator = ClauseGenerator(client)
+        
+        generator.generate_clause(self.nodes[0], self.schema, {"attempt": 0})
+        generator.generate_clause(self.nodes[0], self.schema, {"attempt": 0})
+        self.assertEqual(len(client.requests), 1)
+        
+        generator.generate_clause(self.nodes[0], self.schema, {"attempt": 1})
+        self.assertEqual(len(client.requests), 2)
+    
+    def test_correction_bypasses_cache(self):
+        """Corrections always reach the LLM, whatever the preceding attempt"""
+        client = RecordingLLMClient(lambda prompt: json.dumps({"corrected_sql": "FIXED"}))
+        generator = ClauseGenerator(client)
+        
+        for _ in range(2):
+            result = generator.correct_clause(self.nodes[0], "BAD", "feedback", self.schema)
+            self.assertEqual(result.sql_clause, "FIXED")
+        self.assertEqual(len(client.requests), 2)
+    
+    def test_pipeline_uses_batched_first_attempt(self):
+        """The pipeline verifies the batched result instead of generating it again"""
+        pipeline = DIVASQLPipeline(RecordingLLMClient(self.single_answer))
+        pipeline.current_dag = SemanticDAG("batch_test")
+        pipeline.verifier = SimpleNamespace(
+            verify_clause=lambda node, sql, schema: VerificationResult(
+                VerificationStatus.PASS, [], 1.0
+            )
+        )
+        
+        def fail_generate(*args, **kwargs):
+            self.fail("generate_clause called for a node with a first result")
+        pipeline.generator.generate_clause = fail_generate
+        
+        first_result = GenerationResult(success=True, sql_clause="BATCH 0", confidence=0.9)
+        pipeline.current_dag.add_node(self.nodes[0])
+        
+        self.assertTrue(pipeline._process_node(self.nodes[0], self.schema, None, first_result))
+        self.assertEqual(pipeline.verified_clauses, {"sub0": "BATCH 0"})
+
+
 if __name__ == "__main__":
     # Run all tests
     unittest.main(verbosity=2)